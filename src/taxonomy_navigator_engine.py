@@ -140,11 +140,12 @@ import os
 import json
 import argparse
 import logging
+import pickle
 import time
 import sys
 from typing import List, Dict, Tuple, Optional, Any
 from collections import Counter
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the src directory to the Python path for module imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -157,6 +158,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger("taxonomy_navigator")
 
+# Structured-output schemas: the API guarantees replies that parse as these objects,
+# so the batched Stage 1 and Stage 2 replies are read with a single json.loads
+STAGE1_BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "l1_selections",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "selections": {"type": "array", "items": {"type": "array", "items": {"type": "string"}}}
+            },
+            "required": ["selections"],
+            "additionalProperties": False
+        }
+    }
+}
+
+LEAF_SELECTION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "leaves",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "selected": {"type": "array", "items": {"type": "integer"}}
+            },
+            "required": ["selected"],
+            "additionalProperties": False
+        }
+    }
+}
+
 class TaxonomyNavigator:
     """
     AI-powered taxonomy navigation system for product categorization.
@@ -198,7 +233,7 @@ class TaxonomyNavigator:
 
     __version__ = "12.5"
 
-    def __init__(self, taxonomy_file: str, api_key: str = None, model: str = "gpt-4.1-nano"):
+    def __init__(self, taxonomy_file: str, api_key: str = None, model: str = "gpt-4.1-nano", http_client: Any = None):
         """
         Initialize the TaxonomyNavigator with taxonomy data and API configuration.
 
@@ -206,27 +241,161 @@ class TaxonomyNavigator:
             taxonomy_file (str): Path to the taxonomy file (Google Product Taxonomy format)
             api_key (str, optional): OpenAI API key. If None, will use get_api_key() utility
             model (str): OpenAI model for stages 1 and 3. Defaults to "gpt-4.1-nano"
+            http_client (httpx.Client, optional): Pre-configured HTTP client for the OpenAI
+                SDK, e.g. one with a connection pool sized for concurrent classification.
+                If None, the SDK's default client is used.
             
         Raises:
             ValueError: If API key cannot be obtained
             FileNotFoundError: If taxonomy file doesn't exist
             Exception: If taxonomy tree building fails
         """
+        self._init_settings(taxonomy_file, model)
+        
+        # Build the taxonomy tree and identify leaf nodes
+        self.taxonomy_tree = self._build_taxonomy_tree()
+        
+        self._init_client(api_key, http_client)
+
+    @classmethod
+    def from_lines(cls, lines: List[str], api_key: str = None, model: str = "gpt-4.1-nano", http_client: Any = None) -> "TaxonomyNavigator":
+        """
+        Create a TaxonomyNavigator from taxonomy lines already in memory.
+        
+        The lines use the taxonomy file format, header line first, and are parsed
+        exactly as the file would be. Useful when the taxonomy does not live on disk,
+        such as small fixture taxonomies in tests.
+        
+        Args:
+            lines (List[str]): Taxonomy lines, starting with the header line
+            api_key (str, optional): OpenAI API key. If None, will use get_api_key() utility
+            model (str): OpenAI model for stages 1 and 3. Defaults to "gpt-4.1-nano"
+            http_client (httpx.Client, optional): Pre-configured HTTP client for the OpenAI SDK
+            
+        Returns:
+            TaxonomyNavigator: Ready-to-use navigator (taxonomy_file is None)
+            
+        Raises:
+            ValueError: If API key cannot be obtained
+        """
+        navigator = cls.__new__(cls)
+        navigator._init_settings(None, model)
+        navigator.taxonomy_tree = navigator._build_taxonomy_tree(list(lines))
+        navigator._init_client(api_key, http_client)
+        return navigator
+
+    @classmethod
+    def from_pickle(cls, pickle_file: str, taxonomy_file: str, api_key: str = None, model: str = "gpt-4.1-nano", http_client: Any = None) -> "TaxonomyNavigator":
+        """
+        Create a TaxonomyNavigator from a taxonomy previously saved with save_pickle().
+        
+        Loading the pickled structures skips parsing the taxonomy file, which is the
+        slowest part of start-up for the full Google Product Taxonomy. The caller is
+        responsible for deciding whether the pickle is still current (e.g. by comparing
+        its modification time with the taxonomy file's).
+        
+        Args:
+            pickle_file (str): Path to the pickle written by save_pickle()
+            taxonomy_file (str): Path to the taxonomy file the pickle was built from
+            api_key (str, optional): OpenAI API key. If None, will use get_api_key() utility
+            model (str): OpenAI model for stages 1 and 3. Defaults to "gpt-4.1-nano"
+            http_client (httpx.Client, optional): Pre-configured HTTP client for the OpenAI SDK
+            
+        Returns:
+            TaxonomyNavigator: Ready-to-use navigator
+            
+        Raises:
+            ValueError: If the pickle was written by a different navigator version,
+                        or if the API key cannot be obtained
+            FileNotFoundError: If the pickle file doesn't exist
+        """
+        with open(pickle_file, 'rb') as f:
+            data = pickle.load(f)
+        
+        if not isinstance(data, dict) or data.get("version") != cls.__version__:
+            raise ValueError(f"Taxonomy pickle {pickle_file} was not written by TaxonomyNavigator {cls.__version__}")
+        
+        navigator = cls.__new__(cls)
+        navigator._init_settings(taxonomy_file, model)
+        navigator.taxonomy_tree = data["taxonomy_tree"]
+        navigator.all_paths = data["all_paths"]
+        navigator.leaf_markers = data["leaf_markers"]
+        logger.info(f"Loaded parsed taxonomy from {pickle_file}")
+        
+        navigator._init_client(api_key, http_client)
+        return navigator
+
+    def save_pickle(self, pickle_file: str) -> None:
+        """
+        Save the parsed taxonomy structures so later runs can use from_pickle().
+        
+        Only the parsed data (tree, paths and leaf markers) is stored. Lookup tables
+        and rendered prompt text are derived from it again after loading, so changes
+        to how they are built take effect without touching the taxonomy file.
+        
+        The file is written to a temporary path and then moved into place, so a
+        concurrent reader never sees a partially written pickle.
+        
+        Args:
+            pickle_file (str): Destination path for the pickle
+        """
+        data = {
+            "version": self.__version__,
+            "taxonomy_tree": self.taxonomy_tree,
+            "all_paths": self.all_paths,
+            "leaf_markers": self.leaf_markers,
+        }
+        temp_file = f"{pickle_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'wb') as f:
+            pickle.dump(data, f, protocol=5)
+        os.replace(temp_file, pickle_file)
+        logger.info(f"Saved parsed taxonomy to {pickle_file}")
+
+    def _init_settings(self, taxonomy_file: Optional[str], model: str) -> None:
+        """
+        Set the model configuration and empty lookup caches shared by all constructors.
+        
+        Args:
+            taxonomy_file (str, optional): Path to the taxonomy file (None for in-memory taxonomies)
+            model (str): OpenAI model for stages 1 and 3
+        """
         self.taxonomy_file = taxonomy_file
         self.model = model  # Used for stage 1 (now nano by default)
         self.stage2_model = "gpt-4.1-nano"  # Used for stage 2
         self.stage3_model = "gpt-4.1-mini"  # Used for stage 3 (final selection) - balanced accuracy/cost
         
-        # Build the taxonomy tree and identify leaf nodes
-        self.taxonomy_tree = self._build_taxonomy_tree()
+        # Lookup tables derived from the (immutable) taxonomy, built lazily on first use
+        self._leaf_to_l1_cache = None
+        self._l1_categories_cache = None
+        self._leaf_to_path_cache = None
+        self._leaf_nodes_cache = None
         
+        # Rendered Stage 2 option blocks placed at the START of prompts. Reusing the exact
+        # same string on every call keeps the prompt prefix byte-identical, which lets
+        # OpenAI's automatic prompt caching serve it at a discount and with lower latency.
+        self._leaf_batch_cache = {}
+
+    def _init_client(self, api_key: Optional[str], http_client: Any) -> None:
+        """
+        Create the OpenAI client once the taxonomy has been loaded.
+        
+        Args:
+            api_key (str, optional): OpenAI API key. If None, will use get_api_key() utility
+            http_client (httpx.Client, optional): Pre-configured HTTP client for the OpenAI SDK
+            
+        Raises:
+            ValueError: If API key cannot be obtained
+        """
         # Initialize OpenAI client with API key
         api_key = get_api_key(api_key)
         if not api_key:
             raise ValueError("OpenAI API key not provided. Please set it in api_key.txt, as an environment variable, or provide it as an argument.")
-            
-        self.client = OpenAI(api_key=api_key)
-        logger.info(f"Initialized TaxonomyNavigator with models: {model} (stage 1), {self.stage2_model} (stage 2), {self.stage3_model} (stage 3)")
+        
+        # Imported here rather than at module level: the SDK (and httpx beneath it) is
+        # the slowest import in the project and is only needed once a client is built
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key, http_client=http_client)
+        logger.info(f"Initialized TaxonomyNavigator with models: {self.model} (stage 1), {self.stage2_model} (stage 2), {self.stage3_model} (stage 3)")
         logger.info(f"Taxonomy stats: {len(self.all_paths)} total paths, {sum(self.leaf_markers)} leaf nodes")
 
     def generate_product_summary(self, product_info: str) -> str:
@@ -285,7 +454,7 @@ Summary:""".format(product_info=product_info)
             logger.warning("Falling back to truncated product description")
             return product_info[:400] + "..." if len(product_info) > 400 else product_info
 
-    def _build_taxonomy_tree(self) -> Dict[str, Any]:
+    def _build_taxonomy_tree(self, lines: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Parse the taxonomy file and build a hierarchical tree structure.
         
@@ -298,6 +467,10 @@ Summary:""".format(product_info=product_info)
         - Subsequent lines: Category paths separated by " > "
         - Example: "Electronics > Computers > Laptops"
 
+        Args:
+            lines (List[str], optional): Taxonomy lines, header first, to parse instead of
+                                         reading self.taxonomy_file (see from_lines())
+
         Returns:
             Dict[str, Any]: Hierarchical tree with structure:
                 {
@@ -315,12 +488,13 @@ Summary:""".format(product_info=product_info)
             FileNotFoundError: If taxonomy file doesn't exist
             Exception: If file parsing fails
         """
-        logger.info(f"Building taxonomy tree from {self.taxonomy_file}")
+        logger.info(f"Building taxonomy tree from {self.taxonomy_file or 'in-memory lines'}")
         tree = {"name": "root", "children": {}}
         
         try:
-            with open(self.taxonomy_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            if lines is None:
+                with open(self.taxonomy_file, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
                 
             # Initialize storage for paths and leaf identification
             paths = []
@@ -443,13 +617,8 @@ Summary:""".format(product_info=product_info)
         """
         logger.info(f"Stage 1: Using AI-generated product summary ({len(product_info)} chars)")
         
-        # Extract all unique L1 taxonomy categories from the taxonomy
-        l1_categories = []
-        for i, full_path in enumerate(self.all_paths):
-            if self.leaf_markers[i]:
-                l1_category = full_path.split(" > ")[0]
-                if l1_category not in l1_categories:
-                    l1_categories.append(l1_category)
+        # All unique L1 taxonomy categories from the taxonomy
+        l1_categories = self._get_l1_categories()
         
         if not l1_categories:
             logger.warning("No L1 taxonomy categories found in taxonomy")
@@ -486,48 +655,7 @@ Summary:""".format(product_info=product_info)
             content = response.choices[0].message.content.strip()
             selected_categories = [category.strip() for category in content.split('\n') if category.strip()]
             
-            # CRITICAL VALIDATION: Ensure every returned category actually exists in our L1 list
-            validated_categories = []
-            hallucination_count = 0
-            
-            for category in selected_categories:
-                if category in l1_categories:
-                    validated_categories.append(category)
-                    logger.info(f"✅ VALIDATED: '{category}' exists in L1 taxonomy")
-                else:
-                    logger.error(f"🚨 HALLUCINATION DETECTED: '{category}' does NOT exist in L1 taxonomy")
-                    logger.error(f"Available L1 categories: {l1_categories}")
-                    hallucination_count += 1
-            
-            if hallucination_count > 0:
-                logger.error(f"🚨 CRITICAL: AI hallucinated {hallucination_count} categories in Stage 1")
-                logger.error("🚨 This is a serious anti-hallucination failure")
-            
-            # Remove duplicates while preserving order (case-insensitive)
-            seen = set()
-            unique_categories = []
-            for category in validated_categories:
-                category_lower = category.lower()
-                if category_lower not in seen:
-                    seen.add(category_lower)
-                    unique_categories.append(category)
-            
-            # Ensure we have at most 2 categories after deduplication
-            unique_categories = unique_categories[:2]
-            
-            # Log duplicate removal if any occurred
-            if len(unique_categories) < len(selected_categories):
-                duplicates_removed = len(selected_categories) - len(unique_categories)
-                logger.info(f"Removed {duplicates_removed} duplicate categories from AI response")
-            
-            # Log if fewer than expected categories returned
-            if len(unique_categories) < 2:
-                logger.warning(f"OpenAI returned fewer than 2 unique L1 taxonomy categories: {len(unique_categories)}")
-            
-            logger.info(f"Stage 1 complete: Selected {len(unique_categories)} unique L1 taxonomy categories")
-            
-            # Validate and match categories to our taxonomy
-            return self._validate_categories(unique_categories, l1_categories)
+            return self._finalize_l1_selection(selected_categories, l1_categories)
             
         except Exception as e:
             logger.error(f"Error in Stage 1 L1 selection: {e}")
@@ -538,6 +666,135 @@ Summary:""".format(product_info=product_info)
                 return result
             return []
 
+    def stage1_l1_selection_batch(self, product_infos: List[str]) -> List[List[str]]:
+        """
+        Stage 1 for several products at once: one API call selects L1 categories for all of them.
+        
+        The L1 category list is the same for every product, so sending it once with
+        a numbered list of products amortizes those prompt tokens and the request
+        round-trip over the whole batch. Every per-product selection goes through
+        the same validation as stage1_l1_selection().
+        
+        If the batched response cannot be parsed or does not contain exactly one
+        selection per product, the batch falls back to one stage1_l1_selection()
+        call per product.
+        
+        Args:
+            product_infos (List[str]): Product summaries (generated by AI)
+            
+        Returns:
+            List[List[str]]: For each product, in input order, up to 2 validated L1 categories
+        """
+        if len(product_infos) <= 1:
+            return [self.stage1_l1_selection(product_info) for product_info in product_infos]
+        
+        l1_categories = self._get_l1_categories()
+        if not l1_categories:
+            logger.warning("No L1 taxonomy categories found in taxonomy")
+            return [[] for _ in product_infos]
+        
+        logger.info(f"Stage 1 (batch): Querying OpenAI for top 2 L1 taxonomy categories for {len(product_infos)} products among {len(l1_categories)} options")
+        
+        numbered_products = [f"Product {i}: {product_info}" for i, product_info in enumerate(product_infos, 1)]
+        
+        prompt = (
+            f"For EACH product below, select exactly 2 categories from this list that best match the product:\n\n"
+            f"{chr(10).join(l1_categories)}\n\n"
+            
+            f"Products:\n"
+            f"{chr(10).join(numbered_products)}\n\n"
+            
+            f'Return a JSON object of the form {{"selections": [["Category", "Category"], ...]}} '
+            f"with exactly {len(product_infos)} lists, one per product, in the same order as the products."
+        )
+        
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system", 
+                        "content": "You are a product categorization assistant. Select L1 categories from the provided list using exact spelling. Respond with JSON only."
+                    },
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0,  # Deterministic responses
+                top_p=0,       # Deterministic responses
+                response_format=STAGE1_BATCH_RESPONSE_FORMAT
+            )
+            
+            content = response.choices[0].message.content.strip()
+            selections = json.loads(content)["selections"]
+            
+            if not isinstance(selections, list) or len(selections) != len(product_infos):
+                raise ValueError(f"expected {len(product_infos)} selections, got {len(selections) if isinstance(selections, list) else type(selections).__name__}")
+            
+            return [
+                self._finalize_l1_selection([str(category).strip() for category in selection if str(category).strip()], l1_categories)
+                for selection in selections
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error in batched Stage 1 L1 selection, falling back to per-product calls: {e}")
+            return [self.stage1_l1_selection(product_info) for product_info in product_infos]
+
+    def _finalize_l1_selection(self, selected_categories: List[str], l1_categories: List[str]) -> List[str]:
+        """
+        Validate, deduplicate and cap the L1 categories the AI returned for one product.
+        
+        Shared by the single-product and batched Stage 1 calls so both apply exactly
+        the same anti-hallucination checks.
+        
+        Args:
+            selected_categories (List[str]): Raw category names parsed from the AI response
+            l1_categories (List[str]): All valid L1 categories
+            
+        Returns:
+            List[str]: Up to 2 unique L1 categories that exist in the taxonomy
+        """
+        # CRITICAL VALIDATION: Ensure every returned category actually exists in our L1 list
+        validated_categories = []
+        hallucination_count = 0
+        
+        for category in selected_categories:
+            if category in l1_categories:
+                validated_categories.append(category)
+                logger.info(f"✅ VALIDATED: '{category}' exists in L1 taxonomy")
+            else:
+                logger.error(f"🚨 HALLUCINATION DETECTED: '{category}' does NOT exist in L1 taxonomy")
+                logger.error(f"Available L1 categories: {l1_categories}")
+                hallucination_count += 1
+        
+        if hallucination_count > 0:
+            logger.error(f"🚨 CRITICAL: AI hallucinated {hallucination_count} categories in Stage 1")
+            logger.error("🚨 This is a serious anti-hallucination failure")
+        
+        # Remove duplicates while preserving order (case-insensitive)
+        seen = set()
+        unique_categories = []
+        for category in validated_categories:
+            category_lower = category.lower()
+            if category_lower not in seen:
+                seen.add(category_lower)
+                unique_categories.append(category)
+        
+        # Ensure we have at most 2 categories after deduplication
+        unique_categories = unique_categories[:2]
+        
+        # Log duplicate removal if any occurred
+        if len(unique_categories) < len(selected_categories):
+            duplicates_removed = len(selected_categories) - len(unique_categories)
+            logger.info(f"Removed {duplicates_removed} duplicate categories from AI response")
+        
+        # Log if fewer than expected categories returned
+        if len(unique_categories) < 2:
+            logger.warning(f"OpenAI returned fewer than 2 unique L1 taxonomy categories: {len(unique_categories)}")
+        
+        logger.info(f"Stage 1 complete: Selected {len(unique_categories)} unique L1 taxonomy categories")
+        
+        # Validate and match categories to our taxonomy
+        return self._validate_categories(unique_categories, l1_categories)
+
     def stage2a_first_leaf_selection(self, product_info: str, selected_l1s: List[str]) -> List[str]:
         """
         Stage 2A: Select best leaf nodes from the FIRST chosen L1 taxonomy.
@@ -610,16 +867,13 @@ Summary:""".format(product_info=product_info)
         try:
             # Filter leaf nodes to selected L1 categories only
             filtered_leaves = []
-            leaf_to_l1 = self._create_leaf_to_l1_mapping()
+            excluded_leaves = set(excluded_leaves)  # Checked once per taxonomy leaf
             
-            for i, full_path in enumerate(self.all_paths):
-                if self.leaf_markers[i]:
-                    leaf = full_path.split(" > ")[-1]
-                    l1_category = full_path.split(" > ")[0]
-                    
-                    # Only include if in selected L1 categories and not excluded
-                    if l1_category in selected_l1s and leaf not in excluded_leaves:
-                        filtered_leaves.append(leaf)
+            # The cached leaf -> L1 mapping is in taxonomy order, so no path is re-split here
+            for leaf, l1_category in self._create_leaf_to_l1_mapping().items():
+                # Only include if in selected L1 categories and not excluded
+                if l1_category in selected_l1s and leaf not in excluded_leaves:
+                    filtered_leaves.append(leaf)
             
             if not filtered_leaves:
                 logger.warning(f"No leaf nodes found for L1 categories: {selected_l1s}")
@@ -630,44 +884,32 @@ Summary:""".format(product_info=product_info)
             # Process in batches of 100 to handle large category lists
             batch_size = 100
             all_selected_numbers = []
+            option_batches = self._get_leaf_option_batches(filtered_leaves, batch_size)
             
             for batch_start in range(0, len(filtered_leaves), batch_size):
                 batch_end = min(batch_start + batch_size, len(filtered_leaves))
-                batch_leaves = filtered_leaves[batch_start:batch_end]
-                
-                if not batch_leaves:
-                    continue
-                    
                 logger.info(f"Processing batch {batch_start//batch_size + 1}: options {batch_start + 1}-{batch_end}")
                 
-                # Create numbered list for this batch
-                numbered_options = []
-                leaf_mapping = {}  # Map batch numbers to leaf names
-                for i, leaf in enumerate(batch_leaves, 1):
-                    l1_category = leaf_to_l1.get(leaf, "Unknown")
-                    numbered_options.append(f"{i}. {leaf} (L1: {l1_category})")
-                    leaf_mapping[i] = leaf
+                # Numbered options for this batch (cached, so the prompt prefix is byte-identical
+                # every time the same categories are offered)
+                options_block, leaf_mapping = option_batches[batch_start // batch_size]
                 
-                # Construct prompt with numbered options
+                # Construct prompt with the numbered options first and the product last
                 prompt = (
+                    f"{options_block}"
+                    
                     f"Product: {product_info}\n\n"
                     
-                    f"Select up to 15 categories that match this product from the numbered list below.\n"
+                    f"Select up to 15 categories that match this product from the numbered list above.\n"
                     f"Think carefully about what the product actually is.\n"
                     f"Be aware: The list may contain both main product categories AND accessories/parts.\n"
                     f"IMPORTANT: If the product is a complete item (like a circular saw), choose the main product category (e.g., 'Handheld Circular Saws'), NOT the accessories category (e.g., 'Handheld Circular Saw Accessories').\n"
                     f"Only choose accessory categories if the product is actually an accessory/part, not the main product itself.\n"
                     f"Examples: A TV should be 'Televisions' not 'TV Mounts'; A laptop should be 'Laptops' not 'Laptop Cases'.\n\n"
                     
-                    f"Categories to choose from (batch {batch_start//batch_size + 1} of {(len(filtered_leaves) + batch_size - 1)//batch_size}):\n"
-                    f"{chr(10).join(numbered_options)}\n\n"
-                    
-                    f"Return ONLY the numbers of matching categories (up to 15), one per line.\n"
-                    f"If no categories match, return 'NONE'.\n"
-                    f"Example response:\n"
-                    f"3\n"
-                    f"7\n"
-                    f"15"
+                    f'Return ONLY a JSON object of the form {{"selected": [3, 7, 15]}} '
+                    f"with the numbers of matching categories (up to 15).\n"
+                    f'If no categories match, return {{"selected": []}}.'
                 )
                 
                 try:
@@ -677,46 +919,30 @@ Summary:""".format(product_info=product_info)
                         messages=[
                             {
                                 "role": "system", 
-                                "content": "You are a product categorization assistant. Select categories by their numbers only. Return only numbers, one per line."
+                                "content": "You are a product categorization assistant. Select categories by their numbers only. Return only the requested JSON object."
                             },
                             {"role": "user", "content": prompt}
                         ],
                         temperature=0,  # Deterministic responses
-                        top_p=0        # Deterministic responses
+                        top_p=0,       # Deterministic responses
+                        response_format=LEAF_SELECTION_RESPONSE_FORMAT
                     )
                     
                     # Parse response and extract selected category numbers
                     content = response.choices[0].message.content.strip()
                     
-                    if content.upper() != "NONE":
-                        # Extract all numbers from the response
-                        import re
-                        for line in content.split('\n'):
-                            line = line.strip()
-                            if line:
-                                # Extract numbers from the line
-                                numbers = re.findall(r'\d+', line)
-                                for num_str in numbers:
-                                    try:
-                                        num = int(num_str)
-                                        if 1 <= num <= len(leaf_mapping):  # Validate number is in range
-                                            leaf_name = leaf_mapping[num]
-                                            all_selected_numbers.append(leaf_name)
-                                            logger.info(f"✅ Batch {batch_start//batch_size + 1}: Selected option {num}: '{leaf_name}'")
-                                    except ValueError:
-                                        continue
+                    for num in self._parse_selected_numbers(content):
+                        if 1 <= num <= len(leaf_mapping):  # Validate number is in range
+                            leaf_name = leaf_mapping[num]
+                            all_selected_numbers.append(leaf_name)
+                            logger.info(f"✅ Batch {batch_start//batch_size + 1}: Selected option {num}: '{leaf_name}'")
                                     
                 except Exception as e:
                     logger.error(f"Error processing batch {batch_start//batch_size + 1}: {e}")
                     continue
             
             # Remove duplicates while preserving order
-            seen = set()
-            unique_leaves = []
-            for leaf in all_selected_numbers:
-                if leaf not in seen:
-                    seen.add(leaf)
-                    unique_leaves.append(leaf)
+            unique_leaves = list(dict.fromkeys(all_selected_numbers))
             
             # Note: We now allow up to 15 per batch, so total could be much higher
             logger.info(f"Stage {stage_name} complete: Selected {len(unique_leaves)} unique leaf nodes from all batches")
@@ -727,6 +953,71 @@ Summary:""".format(product_info=product_info)
             logger.error(f"Error in _leaf_selection_helper: {e}")
             return []
 
+    def _parse_selected_numbers(self, content: str) -> List[int]:
+        """
+        Read the option numbers out of a Stage 2 leaf selection reply.
+        
+        With structured outputs the reply is a {"selected": [...]} object and is
+        decoded in one json.loads call. Replies that are not valid JSON (older models,
+        or a client that ignores response_format) fall back to collecting every
+        number in the text, which also covers the legacy one-number-per-line format.
+        
+        Args:
+            content (str): Raw reply content from the API
+            
+        Returns:
+            List[int]: Selected option numbers in reply order (not yet range-checked)
+        """
+        try:
+            selected = json.loads(content)["selected"]
+            return [int(num) for num in selected]
+        except (ValueError, TypeError, KeyError):
+            import re
+            return [int(num_str) for num_str in re.findall(r'\d+', content)]
+
+    def _get_leaf_option_batches(self, filtered_leaves: List[str], batch_size: int) -> List[Tuple[str, Dict[int, str]]]:
+        """
+        Render the numbered Stage 2 option blocks for a list of leaf nodes, once.
+        
+        The rendered blocks are cached by leaf list, so every product that is offered
+        the same categories gets a byte-identical prompt prefix (and therefore benefits
+        from OpenAI's automatic prompt caching).
+        
+        Args:
+            filtered_leaves (List[str]): Leaf nodes offered in Stage 2, in taxonomy order
+            batch_size (int): Number of options per batch
+            
+        Returns:
+            List[Tuple[str, Dict[int, str]]]: For each batch, the rendered options block
+                and the mapping from option number to leaf name
+        """
+        cache_key = (batch_size, tuple(filtered_leaves))
+        if cache_key not in self._leaf_batch_cache:
+            leaf_to_l1 = self._create_leaf_to_l1_mapping()
+            total_batches = (len(filtered_leaves) + batch_size - 1) // batch_size
+            option_batches = []
+            
+            for batch_start in range(0, len(filtered_leaves), batch_size):
+                batch_leaves = filtered_leaves[batch_start:batch_start + batch_size]
+                
+                # Create numbered list for this batch
+                numbered_options = []
+                leaf_mapping = {}  # Map batch numbers to leaf names
+                for i, leaf in enumerate(batch_leaves, 1):
+                    l1_category = leaf_to_l1.get(leaf, "Unknown")
+                    numbered_options.append(f"{i}. {leaf} (L1: {l1_category})")
+                    leaf_mapping[i] = leaf
+                
+                options_block = (
+                    f"Categories to choose from (batch {batch_start // batch_size + 1} of {total_batches}):\n"
+                    f"{chr(10).join(numbered_options)}\n\n"
+                )
+                option_batches.append((options_block, leaf_mapping))
+            
+            self._leaf_batch_cache[cache_key] = option_batches
+        
+        return self._leaf_batch_cache[cache_key]
+
     def stage3_final_selection(self, product_info: str, selected_leaves: List[str]) -> int:
         """
         Stage 3: Make the final decision from the combined leaf nodes from Stages 2A and 2B.
@@ -793,7 +1084,7 @@ Summary:""".format(product_info=product_info)
             logger.error(f"Error in Stage 3 final selection: {e}")
             return -1
 
-    def navigate_taxonomy(self, product_info: str) -> Tuple[List[List[str]], int]:
+    def navigate_taxonomy(self, product_info: str, return_intermediates: bool = False) -> Tuple:
         """
         Complete taxonomy navigation process with enhanced AI capabilities.
         
@@ -812,18 +1103,32 @@ Summary:""".format(product_info=product_info)
         
         Args:
             product_info (str): Complete product information for classification
+            return_intermediates (bool): If True, also return the per-stage selections
+                                         so callers can display them without repeating
+                                         any of the API calls
             
         Returns:
             Tuple[List[List[str]], int]: 
                 - List of category paths (each path is a list from root to leaf)
                 - Index of the best match in the paths list
                 Special case: Returns ([["False"]], 0) when classification completely fails
+            When return_intermediates is True, a third element is appended:
+                Dict[str, Any] with keys "summary", "selected_l1s", "leaves_2a" and
+                "leaves_2b" holding whatever each stage produced before completion or failure
                 
         Example:
             paths, best_idx = navigator.navigate_taxonomy("Samsung 65-inch QLED TV")
             # paths = [["Electronics", "Cell Phones", "Smartphones"]]
             # best_idx = 0
+            
+            paths, best_idx, stages = navigator.navigate_taxonomy(product, return_intermediates=True)
+            # stages["selected_l1s"] = ["Electronics", "Hardware"]
         """
+        intermediates = {"summary": None, "selected_l1s": [], "leaves_2a": [], "leaves_2b": []}
+        
+        def finish(paths: List[List[str]], best_idx: int) -> Tuple:
+            return (paths, best_idx, intermediates) if return_intermediates else (paths, best_idx)
+        
         try:
             logger.info("="*80)
             logger.info(f"Starting taxonomy navigation for: {product_info[:100]}...")
@@ -833,139 +1138,240 @@ Summary:""".format(product_info=product_info)
             # Create an AI-generated summary for all stages (1, 2, and 3)
             logger.info("\n📝 GENERATING PRODUCT SUMMARY FOR ALL STAGES")
             product_summary = self.generate_product_summary(product_info)
+            intermediates["summary"] = product_summary
             logger.info(f"Summary will be used for all categorization stages")
             
             # ================== STAGE 1: L1 TAXONOMY SELECTION ==================
             # AI selects the top 2 L1 taxonomy categories from all available options
             logger.info("\n🎯 STAGE 1: L1 TAXONOMY SELECTION")
-            logger.info(f"Objective: Select top 2 L1 categories from all {len(set(path.split(' > ')[0] for path in self.all_paths if self.leaf_markers[self.all_paths.index(path)]))} unique L1 options")
+            logger.info(f"Objective: Select top 2 L1 categories from all {len(self._get_l1_categories())} unique L1 options")
             
             selected_l1s = self.stage1_l1_selection(product_summary)  # Use summary instead of full description
+            intermediates["selected_l1s"] = selected_l1s
             
-            if not selected_l1s:
-                logger.error("Stage 1 failed: No L1 categories selected")
-                return [["False"]], 0
-            
-            logger.info(f"✅ Stage 1 Result: Selected {len(selected_l1s)} L1 categories: {selected_l1s}")
-            
-            # ================== STAGE 2A: FIRST L1 LEAF SELECTION ==================
-            # AI selects the first 15 best leaf nodes from the FIRST chosen L1 taxonomy
-            logger.info("\n🔍 STAGE 2A: FIRST L1 LEAF SELECTION")
-            logger.info(f"Objective: Select top 15 leaf nodes from L1 category: {selected_l1s[0]}")
-            
-            selected_leaves_2a = self.stage2a_first_leaf_selection(product_summary, selected_l1s)  # Use summary
-            
-            logger.info(f"✅ Stage 2A Result: Selected {len(selected_leaves_2a)} leaf nodes from first L1")
-            
-            # ================== STAGE 2B: SECOND L1 LEAF SELECTION ==================
-            # AI selects the second 15 best leaf nodes from the SECOND chosen L1 taxonomy
-            # Skip if only 1 L1 was selected
-            if len(selected_l1s) >= 2:
-                logger.info("\n🔍 STAGE 2B: SECOND L1 LEAF SELECTION")
-                logger.info(f"Objective: Select top 15 leaf nodes from L1 category: {selected_l1s[1]}")
-                
-                selected_leaves_2b = self.stage2b_second_leaf_selection(product_summary, selected_l1s, selected_leaves_2a)  # Use summary
-                
-                logger.info(f"✅ Stage 2B Result: Selected {len(selected_leaves_2b)} leaf nodes from second L1")
-            else:
-                logger.info("\n🔍 STAGE 2B: SKIPPED (only 1 L1 category selected)")
-                selected_leaves_2b = []
-            
-            # Combine all selected leaves from stages 2A and 2B
-            all_selected_leaves = selected_leaves_2a + selected_leaves_2b
-            
-            if not all_selected_leaves:
-                logger.error("Stage 2 failed: No leaf nodes selected from any L1 category")
-                return [["False"]], 0
+            return finish(*self._complete_navigation(product_summary, selected_l1s, intermediates))
             
-            logger.info(f"\n📊 Stage 2 Summary: Total {len(all_selected_leaves)} unique leaf nodes selected")
-            
-            # ================== STAGE 3: FINAL SELECTION ==================
-            # AI makes the final selection from all candidates
-            # Skip if only 1 leaf was selected
-            if len(all_selected_leaves) == 1:
-                logger.info("\n🏆 STAGE 3: FINAL SELECTION - SKIPPED")
-                logger.info(f"Only 1 leaf was selected in Stage 2, using: '{all_selected_leaves[0]}'")
-                best_match_idx = 0
-            else:
-                logger.info("\n🏆 STAGE 3: FINAL SELECTION")
-                logger.info(f"Objective: Select the single best match from {len(all_selected_leaves)} candidates")
-                logger.info("Note: Using AI-generated summary for consistency with stages 1-2")
-                
-                best_match_idx = self.stage3_final_selection(product_summary, all_selected_leaves)  # Use summary instead of full description
-                
-                if best_match_idx < 0:
-                    logger.error("Stage 3 failed: Unable to determine best match")
-                    return [["False"]], 0
-                
-                logger.info(f"✅ Stage 3 Result: Selected index {best_match_idx} - '{all_selected_leaves[best_match_idx]}'")
-            
-            # ================== CONVERT TO FULL PATHS ==================
-            # Convert the selected leaf node to its full taxonomy path
-            selected_leaf = all_selected_leaves[best_match_idx]
+        except Exception as e:
+            logger.error(f"Critical error in navigate_taxonomy: {e}", exc_info=True)
+            return finish([["False"]], 0)
+
+    def _complete_navigation(self, product_summary: str, selected_l1s: List[str], intermediates: Dict[str, Any]) -> Tuple[List[List[str]], int]:
+        """
+        Run Stages 2A, 2B and 3 for one product whose Stage 1 selection is already known.
+        
+        Shared by navigate_taxonomy() and navigate_taxonomy_batch(). The Stage 2
+        selections are recorded in the given intermediates dict as they are made.
+        
+        Args:
+            product_summary (str): AI-generated product summary
+            selected_l1s (List[str]): L1 categories selected in Stage 1
+            intermediates (Dict[str, Any]): Per-stage selections, updated in place
             
-            # Find the full path for this leaf
-            full_paths = []
-            for i, path in enumerate(self.all_paths):
-                if self.leaf_markers[i] and path.endswith(selected_leaf):
-                    # Verify exact match (not just endswith to avoid false positives)
-                    path_parts = path.split(" > ")
-                    if path_parts[-1] == selected_leaf:
-                        full_paths.append(path_parts)
-            
-            if not full_paths:
-                logger.error(f"Failed to find full path for leaf: {selected_leaf}")
+        Returns:
+            Tuple[List[List[str]], int]: Same as navigate_taxonomy() without intermediates
+        """
+        if not selected_l1s:
+            logger.error("Stage 1 failed: No L1 categories selected")
+            return [["False"]], 0
+        
+        logger.info(f"✅ Stage 1 Result: Selected {len(selected_l1s)} L1 categories: {selected_l1s}")
+        
+        # ================== STAGE 2A: FIRST L1 LEAF SELECTION ==================
+        # AI selects the first 15 best leaf nodes from the FIRST chosen L1 taxonomy
+        logger.info("\n🔍 STAGE 2A: FIRST L1 LEAF SELECTION")
+        logger.info(f"Objective: Select top 15 leaf nodes from L1 category: {selected_l1s[0]}")
+        
+        selected_leaves_2a = self.stage2a_first_leaf_selection(product_summary, selected_l1s)  # Use summary
+        intermediates["leaves_2a"] = selected_leaves_2a
+        
+        logger.info(f"✅ Stage 2A Result: Selected {len(selected_leaves_2a)} leaf nodes from first L1")
+        
+        # ================== STAGE 2B: SECOND L1 LEAF SELECTION ==================
+        # AI selects the second 15 best leaf nodes from the SECOND chosen L1 taxonomy
+        # Skip if only 1 L1 was selected
+        if len(selected_l1s) >= 2:
+            logger.info("\n🔍 STAGE 2B: SECOND L1 LEAF SELECTION")
+            logger.info(f"Objective: Select top 15 leaf nodes from L1 category: {selected_l1s[1]}")
+            
+            selected_leaves_2b = self.stage2b_second_leaf_selection(product_summary, selected_l1s, selected_leaves_2a)  # Use summary
+            intermediates["leaves_2b"] = selected_leaves_2b
+            
+            logger.info(f"✅ Stage 2B Result: Selected {len(selected_leaves_2b)} leaf nodes from second L1")
+        else:
+            logger.info("\n🔍 STAGE 2B: SKIPPED (only 1 L1 category selected)")
+            selected_leaves_2b = []
+        
+        # Combine all selected leaves from stages 2A and 2B
+        all_selected_leaves = selected_leaves_2a + selected_leaves_2b
+        
+        if not all_selected_leaves:
+            logger.error("Stage 2 failed: No leaf nodes selected from any L1 category")
+            return [["False"]], 0
+        
+        logger.info(f"\n📊 Stage 2 Summary: Total {len(all_selected_leaves)} unique leaf nodes selected")
+        
+        # ================== STAGE 3: FINAL SELECTION ==================
+        # AI makes the final selection from all candidates
+        # Skip if only 1 leaf was selected
+        if len(all_selected_leaves) == 1:
+            logger.info("\n🏆 STAGE 3: FINAL SELECTION - SKIPPED")
+            logger.info(f"Only 1 leaf was selected in Stage 2, using: '{all_selected_leaves[0]}'")
+            best_match_idx = 0
+        else:
+            logger.info("\n🏆 STAGE 3: FINAL SELECTION")
+            logger.info(f"Objective: Select the single best match from {len(all_selected_leaves)} candidates")
+            logger.info("Note: Using AI-generated summary for consistency with stages 1-2")
+            
+            best_match_idx = self.stage3_final_selection(product_summary, all_selected_leaves)  # Use summary instead of full description
+            
+            if best_match_idx < 0:
+                logger.error("Stage 3 failed: Unable to determine best match")
                 return [["False"]], 0
             
-            # Return the first matching path (there should typically be only one)
-            logger.info("="*80)
-            logger.info(f"✅ NAVIGATION COMPLETE: {' > '.join(full_paths[0])}")
-            logger.info("="*80)
-            
-            return full_paths[:1], 0  # Return single best path
-            
-        except Exception as e:
-            logger.error(f"Critical error in navigate_taxonomy: {e}", exc_info=True)
+            logger.info(f"✅ Stage 3 Result: Selected index {best_match_idx} - '{all_selected_leaves[best_match_idx]}'")
+        
+        # ================== CONVERT TO FULL PATHS ==================
+        # Convert the selected leaf node to its full taxonomy path
+        selected_leaf = all_selected_leaves[best_match_idx]
+        
+        # Find the full path for this leaf (leaf names are unique within the taxonomy)
+        leaf_path = self._create_leaf_to_path_mapping().get(selected_leaf)
+        full_paths = [leaf_path.split(" > ")] if leaf_path is not None else []
+        
+        if not full_paths:
+            logger.error(f"Failed to find full path for leaf: {selected_leaf}")
             return [["False"]], 0
+        
+        # Return the first matching path (there should typically be only one)
+        logger.info("="*80)
+        logger.info(f"✅ NAVIGATION COMPLETE: {leaf_path}")
+        logger.info("="*80)
+        
+        return full_paths[:1], 0  # Return single best path
+
+    def navigate_taxonomy_batch(self, product_infos: List[str], return_intermediates: bool = False, max_workers: int = 1) -> List[Tuple]:
+        """
+        Classify several products, sharing a single Stage 1 API call across the batch.
+        
+        Each product still gets its own AI summary and its own Stage 2A/2B/3 calls,
+        since those prompts depend on the product's own L1 selections and candidates.
+        Stage 1 sends the same L1 category list for every product, so it is batched
+        through stage1_l1_selection_batch().
+        
+        Classification is entirely bound by API latency, so with max_workers > 1 the
+        per-product summaries and the per-product Stage 2A/2B/3 chains run on a thread
+        pool. Wall-clock time then grows with the number of stages rather than with
+        the number of products. Results are always returned in input order.
+        
+        Args:
+            product_infos (List[str]): Complete product information for each product
+            return_intermediates (bool): If True, each result also includes the per-stage
+                                         selections, as in navigate_taxonomy()
+            max_workers (int): Number of products classified concurrently (default: 1, serial)
+            
+        Returns:
+            List[Tuple]: One navigate_taxonomy()-style result per product, in input order
+        """
+        logger.info(f"Starting batched taxonomy navigation for {len(product_infos)} products")
+        
+        def complete(product_info: str, product_summary: str, selected_l1s: List[str]) -> Tuple:
+            intermediates = {"summary": product_summary, "selected_l1s": selected_l1s, "leaves_2a": [], "leaves_2b": []}
+            try:
+                paths, best_idx = self._complete_navigation(product_summary, selected_l1s, intermediates)
+            except Exception as e:
+                logger.error(f"Critical error in navigate_taxonomy_batch for '{product_info[:100]}': {e}", exc_info=True)
+                paths, best_idx = [["False"]], 0
+            return (paths, best_idx, intermediates) if return_intermediates else (paths, best_idx)
+        
+        workers = min(max(1, max_workers), len(product_infos))
+        if workers <= 1:
+            product_summaries = [self.generate_product_summary(product_info) for product_info in product_infos]
+            l1_selections = self.stage1_l1_selection_batch(product_summaries)
+            return [complete(*args) for args in zip(product_infos, product_summaries, l1_selections)]
+        
+        executor = ThreadPoolExecutor(max_workers=workers)
+        interrupted = False
+        try:
+            product_summaries = list(executor.map(self.generate_product_summary, product_infos))
+            l1_selections = self.stage1_l1_selection_batch(product_summaries)
+            return list(executor.map(complete, product_infos, product_summaries, l1_selections))
+        except KeyboardInterrupt:
+            interrupted = True
+            raise
+        finally:
+            # executor.map queues the whole batch up front; on any early exit drop the products
+            # that have not started, and on Ctrl-C don't wait for the in-flight API calls either
+            executor.shutdown(wait=not interrupted, cancel_futures=True)
 
     def _extract_leaf_nodes(self) -> Tuple[List[str], List[str]]:
         """
         Extract all leaf nodes (end categories) from the taxonomy.
         
+        The lists are built once and the same pair is returned on every subsequent
+        call. Callers must treat them as read-only.
+        
         Returns:
             Tuple[List[str], List[str]]: 
                 - Full paths of leaf nodes
                 - Leaf node names (last part of path)
         """
-        logger.info("Extracting leaf nodes from taxonomy")
-        
-        leaf_paths = []
-        leaf_names = []
+        if self._leaf_nodes_cache is None:
+            logger.info("Extracting leaf nodes from taxonomy")
+            
+            leaf_paths = []
+            leaf_names = []
+            
+            for i, full_path in enumerate(self.all_paths):
+                if self.leaf_markers[i]:
+                    leaf_paths.append(full_path)
+                    # Extract just the leaf name (last part after " > ")
+                    leaf_name = full_path.split(" > ")[-1]
+                    leaf_names.append(leaf_name)
+            
+            logger.info(f"Found {len(leaf_paths)} leaf nodes")
+            self._leaf_nodes_cache = (leaf_paths, leaf_names)
+        return self._leaf_nodes_cache
+
+    def _get_l1_categories(self) -> List[str]:
+        """
+        Get all unique L1 taxonomy categories that contain at least one leaf node.
         
-        for i, full_path in enumerate(self.all_paths):
-            if self.leaf_markers[i]:
-                leaf_paths.append(full_path)
-                # Extract just the leaf name (last part after " > ")
-                leaf_name = full_path.split(" > ")[-1]
-                leaf_names.append(leaf_name)
+        The list is built once, in taxonomy order, and the same list is returned on
+        every subsequent call. Callers must treat it as read-only.
         
-        logger.info(f"Found {len(leaf_paths)} leaf nodes")
-        return leaf_paths, leaf_names
+        Returns:
+            List[str]: Unique L1 category names in the order they appear in the taxonomy
+        """
+        if self._l1_categories_cache is None:
+            l1_categories = []
+            for i, full_path in enumerate(self.all_paths):
+                if self.leaf_markers[i]:
+                    l1_category = full_path.split(" > ")[0]
+                    if l1_category not in l1_categories:
+                        l1_categories.append(l1_category)
+            self._l1_categories_cache = l1_categories
+        return self._l1_categories_cache
 
     def _create_leaf_to_l1_mapping(self) -> Dict[str, str]:
         """
         Create a mapping from leaf node names to their L1 taxonomy categories.
         
+        The taxonomy never changes for the lifetime of the navigator, so the mapping
+        is built once and the same dict is returned on every subsequent call.
+        Callers must treat it as read-only.
+        
         Returns:
             Dict[str, str]: Mapping from leaf names to L1 categories
         """
-        leaf_to_l1 = {}
-        for i, path in enumerate(self.all_paths):
-            if self.leaf_markers[i]:
-                leaf_name = path.split(" > ")[-1]
-                l1_category = path.split(" > ")[0]  # First part is L1 category
-                leaf_to_l1[leaf_name] = l1_category
-        return leaf_to_l1
+        if self._leaf_to_l1_cache is None:
+            leaf_to_l1 = {}
+            for i, path in enumerate(self.all_paths):
+                if self.leaf_markers[i]:
+                    leaf_name = path.split(" > ")[-1]
+                    l1_category = path.split(" > ")[0]  # First part is L1 category
+                    leaf_to_l1[leaf_name] = l1_category
+            self._leaf_to_l1_cache = leaf_to_l1
+        return self._leaf_to_l1_cache
 
     def _create_leaf_to_l2_mapping(self) -> Dict[str, str]:
         """
@@ -988,15 +1394,19 @@ Summary:""".format(product_info=product_info)
         """
         Create a mapping from leaf node names to their full taxonomy paths.
         
+        Built once, like the L1 mapping; callers must treat the dict as read-only.
+        
         Returns:
             Dict[str, str]: Mapping from leaf names to full paths
         """
-        leaf_to_path = {}
-        for i, path in enumerate(self.all_paths):
-            if self.leaf_markers[i]:
-                leaf_name = path.split(" > ")[-1]
-                leaf_to_path[leaf_name] = path
-        return leaf_to_path
+        if self._leaf_to_path_cache is None:
+            leaf_to_path = {}
+            for i, path in enumerate(self.all_paths):
+                if self.leaf_markers[i]:
+                    leaf_name = path.split(" > ")[-1]
+                    leaf_to_path[leaf_name] = path
+            self._leaf_to_path_cache = leaf_to_path
+        return self._leaf_to_path_cache
 
     def _convert_leaves_to_paths(self, selected_leaves: List[str]) -> List[List[str]]:
         """
@@ -1014,9 +1424,8 @@ Summary:""".format(product_info=product_info)
         final_paths = []
         for leaf in selected_leaves:
             if leaf in leaf_to_path:
-                path = leaf_to_path[leaf].split(" > ")
-                final_paths.append(path)
-                logger.debug(f"Converted '{leaf}' to path: {' > '.join(path)}")
+                final_paths.append(leaf_to_path[leaf].split(" > "))
+                logger.debug(f"Converted '{leaf}' to path: {leaf_to_path[leaf]}")
             else:
                 logger.warning(f"Could not find full path for leaf: {leaf}")
         
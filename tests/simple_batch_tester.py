@@ -78,45 +78,118 @@ Last Updated: 2025-01-29
 import os
 import sys
 import argparse
-import logging
-import random
-import textwrap
+import itertools
+from collections import OrderedDict
+from typing import TYPE_CHECKING
 
-# Add the src directory to the Python path for module imports
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.taxonomy_navigator_engine import TaxonomyNavigator
-from src.config import get_api_key
+# Repository paths, resolved once at import time
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DEFAULT_TAXONOMY = os.path.join(_REPO_ROOT, 'data', 'taxonomy.en-US.txt')
 
-def read_products_file(filename: str) -> list:
+# Products files are read in chunks of this many bytes
+_READ_CHUNK_SIZE = 32 * 1024
+
+# Number of distinct products whose results are kept for reuse by later duplicates
+_RESULT_CACHE_SIZE = 4096
+
+# Separator lines used in the console output, built once
+_SEP20 = "=" * 20
+_SEP80 = "=" * 80
+_SEP100 = "=" * 100
+_PRODUCT_SEP = f"\n{_SEP100}\n"
+
+# Logger levels applied with --verbose: (logger name, level)
+_VERBOSE_LOG_LEVELS = (
+    ("", "INFO"),                    # Root logger
+    ("taxonomy_navigator", "INFO"),
+)
+
+# Add the repository root to the Python path for module imports.
+# The engine (and with it openai/httpx) is only imported once main() has parsed
+# and validated its arguments, so --help and argument errors respond instantly.
+sys.path.insert(0, _REPO_ROOT)
+if TYPE_CHECKING:
+    from src.taxonomy_navigator_engine import TaxonomyNavigator
+
+def iter_products(filename: str):
     """
-    Read products from a text file, one product per line.
+    Lazily yield products from a text file, one product per line.
     
-    This function reads products from a file and filters out empty lines.
-    It's designed for simple, straightforward file reading without extensive
-    error handling since this is a simplified testing tool.
+    Lines are stripped and empty lines are skipped. The file is read in 32 KB
+    binary chunks that are split into lines in bulk, and because this is a
+    generator only the current chunk is held in memory, so arbitrarily large
+    product files can be streamed straight into classification. It's designed for simple,
+    straightforward file reading without extensive error handling since this
+    is a simplified testing tool.
     
     Args:
         filename (str): Path to the products file
         
-    Returns:
-        list: List of product descriptions (strings), with empty lines removed
+    Yields:
+        str: Product descriptions, with empty lines removed
         
     Example:
-        products = read_products_file("sample_products.txt")
-        # Returns: ["iPhone 14: Smartphone", "Xbox Controller: Gaming device"]
+        for product in iter_products("sample_products.txt"):
+            print(product)  # "iPhone 14: Smartphone", "Xbox Controller: Gaming device", ...
+        
+        count = sum(1 for _ in iter_products("sample_products.txt"))
     """
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            # Read all lines, strip whitespace, and filter out empty lines
-            products = [line.strip() for line in f if line.strip()]
-        return products
+        with open(filename, 'rb', buffering=_READ_CHUNK_SIZE) as f:
+            tail = b''
+            for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b''):
+                lines = (tail + chunk).split(b'\n')
+                tail = lines.pop()  # Possibly incomplete last line, completed by the next chunk
+                for line in lines:
+                    product = line.decode('utf-8').strip()
+                    if product:
+                        yield product
+            product = tail.decode('utf-8').strip()
+            if product:
+                yield product
     except FileNotFoundError:
-        print(f"Error: Products file '{filename}' not found.")
+        print(f"❌ Error: Products file '{filename}' not found.")
         sys.exit(1)
     except Exception as e:
         print(f"Error reading products file: {e}")
         sys.exit(1)
 
+def sample_stream(items, k: int) -> tuple:
+    """
+    Randomly sample k items from an iterable in a single pass (reservoir sampling).
+    
+    Uses Algorithm R so that only the k sampled items are ever held in memory,
+    no matter how long the stream is. Every item has an equal chance of being
+    selected. Combined with iter_products() this samples a products file without
+    ever building a list of all its lines.
+    
+    Args:
+        items: Iterable of items to sample from (e.g. iter_products(filename))
+        k (int): Number of items to sample
+        
+    Returns:
+        tuple: (sampled items, total number of items in the stream).
+               If the stream has k or fewer items, all of them are returned.
+        
+    Example:
+        products, total = sample_stream(iter_products("sample_products.txt"), 5)
+        # Returns: (["Nike Air Max 270: ...", ...], 50)
+    """
+    import random  # Only needed for direct-mode sampling
+    
+    reservoir = []
+    total = 0
+    for product in items:
+        if total < k:
+            reservoir.append(product)
+        else:
+            # Replace an existing entry with probability k / (total + 1)
+            j = random.randrange(total + 1)
+            if j < k:
+                reservoir[j] = product
+        total += 1
+    return reservoir, total
+
 def extract_product_title(product_line: str) -> str:
     """
     Extract the product title from a product description line.
@@ -138,137 +211,137 @@ def extract_product_title(product_line: str) -> str:
         extract_product_title("Xbox Controller")
         # Returns: "Xbox Controller"
     """
-    if ':' in product_line:
-        # Split on first colon and return the title part
-        return product_line.split(':', 1)[0].strip()
-    else:
-        # No colon found, return the entire line as title
-        return product_line.strip()
+    # Split on the first colon in a single scan; with no colon the whole line is the title
+    title, colon, _ = product_line.partition(':')
+    return (title if colon else product_line).strip()
 
-def classify_product_with_stage_display(navigator: TaxonomyNavigator, product_line: str, show_stage_paths: bool = False) -> str:
+def _numbered(items) -> str:
+    """Render items as an indented, 1-based numbered list in a single string."""
+    return "\n".join(f"      {i}. {item}" for i, item in enumerate(items, 1))
+
+def classify_product_with_stage_display(navigator: "TaxonomyNavigator", product_line: str, show_stage_paths: bool = False, result: tuple = None, buf: list = None) -> str:
     """
     Classify a single product and optionally display the AI's selections at each stage.
     
-    This function performs the full classification and can display
-    the AI's actual selections at each stage for debugging purposes.
+    This function runs the classification pipeline exactly once. When stage display
+    is enabled, the AI's selections at each stage are printed from the intermediates
+    returned by navigate_taxonomy, so no stage is ever queried twice.
     
     Args:
         navigator (TaxonomyNavigator): Initialized taxonomy navigator
         product_line (str): Product description to classify
         show_stage_paths (bool): Whether to display AI selections at each stage
+        result (tuple, optional): Precomputed navigate_taxonomy() result for this product
+            (e.g. from navigate_taxonomy_batch). Must include intermediates when
+            show_stage_paths is True. If None, the product is classified here.
+        buf (list, optional): Output buffer the stage display lines are appended to, so the
+            caller can write a whole product's output at once. If None, the display is
+            written to stdout in a single write when classification finishes.
         
     Returns:
         str: Final leaf category name, or "False" if no classification found
     """
+    lines = [] if buf is None else buf
     try:
         if show_stage_paths:
-            print(f"\n🔍 CLASSIFICATION PROCESS VISUALIZATION")
-            print("=" * 80)
+            # Run the pipeline once and display what each stage selected along the way
+            if result is None:
+                result = navigator.navigate_taxonomy(product_line, return_intermediates=True)
+            paths, best_match_idx, stages = result
+            summary = stages["summary"]
+            selected_l1s = stages["selected_l1s"]
+            selected_leaves_2a = stages["leaves_2a"]
+            selected_leaves_2b = stages["leaves_2b"]
             
-            # First generate the AI summary
-            print(f"\n📝 GENERATING AI SUMMARY")
-            summary = navigator.generate_product_summary(product_line)
-            # Wrap the summary nicely
-            wrapped_summary = textwrap.fill(summary, width=70, initial_indent="   ", subsequent_indent="   ")
-            print(wrapped_summary)
+            lines.append(f"\n🔍 CLASSIFICATION PROCESS VISUALIZATION")
+            lines.append(_SEP80)
             
-            # Stage 1: Get the AI's top 2 L1 taxonomy selections
-            print(f"\n📋 STAGE 1: Identifying Main Product Categories")
-            print(f"   Goal: Pick 2 broad categories from all {len(set(path.split(' > ')[0] for i, path in enumerate(navigator.all_paths) if navigator.leaf_markers[i]))} options")
+            # The AI summary used for all stages
+            lines.append(f"\n📝 AI SUMMARY")
+            if summary:
+                # Wrap the summary nicely (textwrap is only needed for the stage display)
+                import textwrap
+                wrapped_summary = textwrap.fill(summary, width=70, initial_indent="   ", subsequent_indent="   ")
+                lines.append(wrapped_summary)
             
-            selected_l1s = navigator.stage1_l1_selection(summary)
+            # Stage 1: The AI's top 2 L1 taxonomy selections
+            lines.append(f"\n📋 STAGE 1: Identifying Main Product Categories")
+            lines.append(f"   Goal: Pick 2 broad categories from all {len(navigator._get_l1_categories())} options")
             
-            print(f"\n   ✅ AI Selected {len(selected_l1s)} Main Categories:")
-            for i, l1_category in enumerate(selected_l1s, 1):
-                print(f"      {i}. {l1_category}")
+            if not selected_l1s:
+                lines.append(f"\n❌ STAGE 1 FAILED")
+                lines.append(f"   Reason: AI did not select any main categories")
+                lines.append(_SEP80)
+                return "False"
             
-            # Stage 2A: Show first leaf selection from chosen L1 taxonomies
-            print(f"\n📋 STAGE 2A: Finding Specific Categories in '{selected_l1s[0] if selected_l1s else 'None'}'")
-            print(f"   Goal: Select specific product categories (up to 15 per batch)")
+            lines.append(f"\n   ✅ AI Selected {len(selected_l1s)} Main Categories:")
+            lines.append(_numbered(selected_l1s))
             
-            selected_leaves_2a = navigator.stage2a_first_leaf_selection(summary, selected_l1s)
+            # Stage 2A: First leaf selection from chosen L1 taxonomies
+            lines.append(f"\n📋 STAGE 2A: Finding Specific Categories in '{selected_l1s[0]}'")
+            lines.append(f"   Goal: Select specific product categories (up to 15 per batch)")
             
             if selected_leaves_2a:
-                print(f"\n   ✅ Found {len(selected_leaves_2a)} Relevant Categories:")
-                for i, leaf in enumerate(selected_leaves_2a[:10], 1):  # Show max 10 for readability
-                    print(f"      {i}. {leaf}")
+                lines.append(f"\n   ✅ Found {len(selected_leaves_2a)} Relevant Categories:")
+                lines.append(_numbered(selected_leaves_2a[:10]))  # Show max 10 for readability
                 if len(selected_leaves_2a) > 10:
-                    print(f"      ... and {len(selected_leaves_2a) - 10} more")
+                    lines.append(f"      ... and {len(selected_leaves_2a) - 10} more")
             else:
-                print(f"\n   ⚠️ No specific categories found in '{selected_l1s[0]}' section")
+                lines.append(f"\n   ⚠️ No specific categories found in '{selected_l1s[0]}' section")
             
-            # Stage 2B: Show second leaf selection (only if 2 L1s were selected)
+            # Stage 2B: Second leaf selection (only if 2 L1s were selected)
             if len(selected_l1s) >= 2:
-                print(f"\n📋 STAGE 2B: Finding Specific Categories in '{selected_l1s[1]}'")
-                print(f"   Goal: Select specific product categories (up to 15 per batch)")
-                
-                selected_leaves_2b = navigator.stage2b_second_leaf_selection(summary, selected_l1s, selected_leaves_2a)
+                lines.append(f"\n📋 STAGE 2B: Finding Specific Categories in '{selected_l1s[1]}'")
+                lines.append(f"   Goal: Select specific product categories (up to 15 per batch)")
                 
                 if selected_leaves_2b:
-                    print(f"\n   ✅ Found {len(selected_leaves_2b)} Additional Categories:")
-                    for i, leaf in enumerate(selected_leaves_2b[:10], 1):
-                        print(f"      {i}. {leaf}")
+                    lines.append(f"\n   ✅ Found {len(selected_leaves_2b)} Additional Categories:")
+                    lines.append(_numbered(selected_leaves_2b[:10]))
                     if len(selected_leaves_2b) > 10:
-                        print(f"      ... and {len(selected_leaves_2b) - 10} more")
+                        lines.append(f"      ... and {len(selected_leaves_2b) - 10} more")
                 else:
-                    print(f"\n   ⚠️ No specific categories found in '{selected_l1s[1]}' section")
+                    lines.append(f"\n   ⚠️ No specific categories found in '{selected_l1s[1]}' section")
             else:
-                print(f"\n📋 STAGE 2B: SKIPPED")
-                print(f"   Reason: Only 1 main category was selected, no need to check a second")
-                selected_leaves_2b = []
+                lines.append(f"\n📋 STAGE 2B: SKIPPED")
+                lines.append(f"   Reason: Only 1 main category was selected, no need to check a second")
             
             # Combine all Stage 2 results
             all_selected_leaves = selected_leaves_2a + selected_leaves_2b
             
             # Stage 3 info
             if len(all_selected_leaves) == 0:
-                print(f"\n📋 STAGE 3: CANNOT PROCEED")
-                print(f"   Reason: No specific categories were found")
-                print("=" * 80)
+                lines.append(f"\n📋 STAGE 3: CANNOT PROCEED")
+                lines.append(f"   Reason: No specific categories were found")
+                lines.append(_SEP80)
                 return "False"
-            elif len(all_selected_leaves) == 1:
-                print(f"\n📋 STAGE 3: SKIPPED - Using Single Result")
-                print(f"   Reason: Only 1 category found, no need to choose")
-                print(f"   🎯 Final Category: {all_selected_leaves[0]}")
-                print("=" * 80)
-                # Get the full path for this single result
-                for i, path in enumerate(navigator.all_paths):
-                    if navigator.leaf_markers[i] and path.endswith(all_selected_leaves[0]):
-                        path_parts = path.split(" > ")
-                        if path_parts[-1] == all_selected_leaves[0]:
-                            print(f"\n🎯 FINAL CLASSIFICATION RESULT:")
-                            print(f"   Full Category Path: {path}")
-                            print(f"   Product Category: {all_selected_leaves[0]}")
-                            break
-                return all_selected_leaves[0]
+            
+            if len(all_selected_leaves) == 1:
+                lines.append(f"\n📋 STAGE 3: SKIPPED - Using Single Result")
+                lines.append(f"   Reason: Only 1 category found, no need to choose")
             else:
-                print(f"\n📋 STAGE 3: Making Final Decision")
-                print(f"   Goal: Choose the single best category from {len(all_selected_leaves)} options")
-                print(f"   Note: Using AI-generated summary for consistency across all stages")
-                
-                # Call stage 3 to make the final selection
-                best_idx = navigator.stage3_final_selection(summary, all_selected_leaves)
-                if best_idx >= 0:
-                    selected_leaf = all_selected_leaves[best_idx]
-                    print(f"\n🎯 FINAL CLASSIFICATION RESULT:")
-                    # Get the full path for the selected leaf
-                    for i, path in enumerate(navigator.all_paths):
-                        if navigator.leaf_markers[i] and path.endswith(selected_leaf):
-                            path_parts = path.split(" > ")
-                            if path_parts[-1] == selected_leaf:
-                                print(f"   Full Category Path: {path}")
-                                print(f"   Product Category: {selected_leaf}")
-                                break
-                    print("=" * 80)
-                    return selected_leaf
-                else:
-                    print(f"\n❌ STAGE 3 FAILED")
-                    print(f"   Reason: AI could not select from the options")
-                    print("=" * 80)
-                    return "False"
+                lines.append(f"\n📋 STAGE 3: Making Final Decision")
+                lines.append(f"   Goal: Choose the single best category from {len(all_selected_leaves)} options")
+                lines.append(f"   Note: Using AI-generated summary for consistency across all stages")
+            
+            if paths == [["False"]]:
+                lines.append(f"\n❌ STAGE 3 FAILED")
+                lines.append(f"   Reason: AI could not select from the options")
+                lines.append(_SEP80)
+                return "False"
+            
+            best_path = paths[best_match_idx]
+            # The navigator already holds every leaf's path as a display string
+            full_path = navigator._create_leaf_to_path_mapping().get(best_path[-1]) or ' > '.join(best_path)
+            lines.append(f"\n🎯 FINAL CLASSIFICATION RESULT:")
+            lines.append(f"   Full Category Path: {full_path}")
+            lines.append(f"   Product Category: {best_path[-1]}")
+            lines.append(_SEP80)
+            return best_path[-1]
         else:
             # Non-verbose mode - just do the classification
-            paths, best_match_idx = navigator.navigate_taxonomy(product_line)
+            if result is None:
+                result = navigator.navigate_taxonomy(product_line)
+            paths, best_match_idx = result[:2]
             
             if paths == [["False"]]:
                 return "False"
@@ -279,6 +352,99 @@ def classify_product_with_stage_display(navigator: TaxonomyNavigator, product_li
     except Exception as e:
         # Return error indicator for any classification failures
         return f"Error: {str(e)[:30]}..."
+    finally:
+        if buf is None and lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+
+def load_navigator(taxonomy_file: str, api_key: str, model: str, http_client=None) -> "TaxonomyNavigator":
+    """
+    Create a TaxonomyNavigator, reusing a pickled copy of the parsed taxonomy when possible.
+    
+    Parsing the full taxonomy file is the slowest part of start-up, and the taxonomy
+    rarely changes. The parsed structures are cached in a sidecar file next to the
+    taxonomy (e.g. data/taxonomy.en-US.pkl), which is used whenever it is newer than
+    the taxonomy file and rewritten otherwise.
+    
+    Args:
+        taxonomy_file (str): Path to the taxonomy file
+        api_key (str): OpenAI API key
+        model (str): OpenAI model for stages 1 and 3
+        http_client (httpx.Client, optional): Pre-configured HTTP client for the OpenAI SDK
+        
+    Returns:
+        TaxonomyNavigator: Ready-to-use navigator
+    """
+    from src.taxonomy_navigator_engine import TaxonomyNavigator
+    
+    pickle_file = os.path.splitext(taxonomy_file)[0] + '.pkl'
+    
+    try:
+        if os.path.getmtime(pickle_file) >= os.path.getmtime(taxonomy_file):
+            return TaxonomyNavigator.from_pickle(pickle_file, taxonomy_file, api_key, model, http_client=http_client)
+    except Exception:
+        # Missing, stale or unreadable cache - fall back to parsing the taxonomy file
+        pass
+    
+    navigator = TaxonomyNavigator(taxonomy_file, api_key, model, http_client=http_client)
+    try:
+        navigator.save_pickle(pickle_file)
+    except OSError:
+        # The cache is only an optimization (e.g. the data directory may be read-only)
+        pass
+    return navigator
+
+def classify_in_batches(navigator: "TaxonomyNavigator", products, batch_size: int, return_intermediates: bool = False, concurrency: int = 1):
+    """
+    Classify products in batches, yielding each product with its result in input order.
+    
+    Products are pulled from the (possibly lazy) iterable batch_size at a time and
+    classified with navigate_taxonomy_batch, which shares a single Stage 1 API call
+    across the whole batch and classifies up to `concurrency` of its products at once.
+    
+    Duplicate products are classified only once: products are keyed by their
+    case-insensitive text, and a product seen recently in the run reuses the earlier
+    result instead of repeating every API call. Only the _RESULT_CACHE_SIZE most
+    recently seen products are remembered, so memory stays flat on large files.
+    
+    Args:
+        navigator (TaxonomyNavigator): Initialized taxonomy navigator
+        products: Iterable of product descriptions
+        batch_size (int): Number of products per batch
+        return_intermediates (bool): Whether results should include per-stage selections
+        concurrency (int): Number of products within a batch classified concurrently
+        
+    Yields:
+        tuple: (product_line, navigate_taxonomy()-style result)
+    """
+    cache = OrderedDict()  # Normalized product text -> classification result, least recent first
+    products = iter(products)
+    while True:
+        batch = list(itertools.islice(products, max(1, batch_size)))
+        if not batch:
+            return
+        
+        keys = [product_line.strip().lower() for product_line in batch]
+        
+        # Classify each product not in the cache exactly once, even if it repeats within the batch
+        results = {}
+        unique = {}
+        for key, product_line in zip(keys, batch):
+            if key in results or key in unique:
+                continue
+            if key in cache:
+                cache.move_to_end(key)
+                results[key] = cache[key]
+            else:
+                unique[key] = product_line
+        if unique:
+            batch_results = navigator.navigate_taxonomy_batch(list(unique.values()), return_intermediates=return_intermediates, max_workers=concurrency)
+            for key, result in zip(unique, batch_results):
+                results[key] = cache[key] = result
+                if len(cache) > _RESULT_CACHE_SIZE:
+                    cache.popitem(last=False)
+        
+        for key, product_line in zip(keys, batch):
+            yield product_line, results[key]
 
 def main():
     """
@@ -296,6 +462,8 @@ Examples:
   %(prog)s --products-file my_products.txt          # Custom products file
   %(prog)s --model gpt-4.1-mini                     # Use different model for stages 1&4
   %(prog)s --show-stage-paths                       # Display AI selections at each stage
+  %(prog)s --concurrency 8                          # Classify up to 8 products at once
+  %(prog)s --batch-size 16                          # Share each Stage 1 call across 16 products
   
 Updated Classification Process:
   Preliminary: AI generates 40-60 word product summary (gpt-4.1-nano)
@@ -311,14 +479,17 @@ Output Format:
     iPhone 14 Pro: Smartphones
     Xbox Wireless Controller: Game Controllers
     Nike Air Max 270: Athletic Shoes
+  
+  When stdout is not a terminal (piped or redirected) and --show-stage-paths is
+  not given, banners are skipped and each product is one tab-separated line:
+    <product line>\t<leaf category>
         """
     )
     
     # File configuration
-    default_taxonomy = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'taxonomy.en-US.txt')
     parser.add_argument('--products-file', default='sample_products.txt', 
                        help='Products file to test (default: sample_products.txt)')
-    parser.add_argument('--taxonomy-file', default=default_taxonomy, 
+    parser.add_argument('--taxonomy-file', default=_DEFAULT_TAXONOMY, 
                        help='Taxonomy file path (default: data/taxonomy.en-US.txt)')
     
     # Model configuration
@@ -326,6 +497,10 @@ Output Format:
                        help='OpenAI model for all stages (default: gpt-4.1-nano)')
     parser.add_argument('--api-key', 
                        help='OpenAI API key (optional if set in environment or file)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                       help='Number of products classified concurrently within a batch; also sizes the HTTP connection pool (default: 4)')
+    parser.add_argument('--batch-size', type=int, default=8,
+                       help='Products per batched Stage 1 API call (default: 8)')
     
     # Display options
     parser.add_argument('--show-stage-paths', action='store_true',
@@ -337,7 +512,7 @@ Output Format:
     if len(sys.argv) == 1:
         # Running directly in Python/IDLE - enable stage display by default
         print("🔍 Running in direct mode - showing AI selections at each stage by default")
-        print("=" * 80)
+        print(_SEP80)
         show_stage_paths_default = True
         verbose_default = False
         
@@ -352,7 +527,7 @@ Output Format:
             num_products = 1
         
         print(f"🎲 Will randomly select {num_products} product(s) from the sample file")
-        print("=" * 80)
+        print(_SEP80)
     else:
         # Running with command line arguments - use provided flags
         show_stage_paths_default = False
@@ -366,84 +541,123 @@ Output Format:
         args.show_stage_paths = show_stage_paths_default
         args.verbose = verbose_default
     
+    # Decorated banners only help a human watching a terminal. When output is piped
+    # or redirected, emit one "product<TAB>category" line per product instead.
+    pretty = sys.stdout.isatty() or args.show_stage_paths
+    
     # Configure logging based on verbose flag
+    import logging
     if args.verbose:
-        logging.getLogger().setLevel(logging.INFO)
-        logging.getLogger("taxonomy_navigator").setLevel(logging.INFO)
+        for logger_name, level in _VERBOSE_LOG_LEVELS:
+            logging.getLogger(logger_name).setLevel(level)
     else:
-        # Suppress verbose logging for clean output
-        logging.getLogger().setLevel(logging.CRITICAL)
-        logging.getLogger("taxonomy_navigator").setLevel(logging.CRITICAL)
-        logging.getLogger("httpx").setLevel(logging.CRITICAL)
+        # Suppress all logging for clean output. A single global switch is checked
+        # before any logger or handler is consulted, so disabled calls return immediately.
+        logging.disable(logging.CRITICAL)
     
     try:
         # Validate and get API key
+        from src.config import get_api_key
         api_key = get_api_key(args.api_key)
         if not api_key:
             print("❌ Error: OpenAI API key not provided.")
             print("💡 Please set it in data/api_key.txt, environment variable OPENAI_API_KEY, or use --api-key")
             sys.exit(1)
         
-        # Validate files exist
-        if not os.path.exists(args.products_file):
-            print(f"❌ Error: Products file '{args.products_file}' not found.")
-            sys.exit(1)
-            
-        if not os.path.exists(args.taxonomy_file):
-            print(f"❌ Error: Taxonomy file '{args.taxonomy_file}' not found.")
-            sys.exit(1)
-        
-        # Initialize the taxonomy navigator
-        navigator = TaxonomyNavigator(args.taxonomy_file, api_key, args.model)
-        
-        # Read products from file
-        products = read_products_file(args.products_file)
-        
-        if not products:
-            print("❌ No products found in the file.")
-            sys.exit(1)
-        
-        # If running in direct mode, randomly select the specified number of products
+        # Files are not checked up front: opening them reports a missing file, which
+        # saves a stat per file. Products are read first so a bad path fails before
+        # the taxonomy is loaded.
         if len(sys.argv) == 1 and num_products is not None:
-            if num_products >= len(products):
-                print(f"📝 Note: Requested {num_products} products, but only {len(products)} available. Using all products.")
-                selected_products = products
+            # Direct mode: randomly sample the requested number of products in a single
+            # pass over the file, without loading every product into memory first
+            selected_products, total_products = sample_stream(iter_products(args.products_file), num_products)
+            
+            if not selected_products:
+                print("❌ No products found in the file.")
+                sys.exit(1)
+            
+            if num_products >= total_products:
+                print(f"📝 Note: Requested {num_products} products, but only {total_products} available. Using all products.")
             else:
-                selected_products = random.sample(products, num_products)
-                print(f"🎲 Randomly selected {len(selected_products)} products from {len(products)} total")
+                print(f"🎲 Randomly selected {len(selected_products)} products from {total_products} total")
+            total_products = len(selected_products)
         else:
-            # Use all products when run with command line arguments
-            selected_products = products
-        
-        print(f"\n🚀 Starting Classification Process...")
-        print(f"   Total Products: {len(selected_products)}")
-        print(f"   Taxonomy Categories: ~5,000+ options to choose from")
-        print("=" * 80)
-        
-        # Process each selected product and display in the requested format
-        for i, product_line in enumerate(selected_products):
-            # Show Stage paths for every product if requested (not just the first one)
-            show_paths = args.show_stage_paths
-            
-            if show_paths:
-                print(f"\n{'='*20} PRODUCT {i+1} of {len(selected_products)} {'='*20}")
-                print(f"\n📦 PRODUCT DESCRIPTION:")
-                print(f"   Full: {product_line[:100]}..." if len(product_line) > 100 else f"   Full: {product_line}")
-                print(f"   AI will generate a 40-60 word summary for all categorization stages")
-                print("=" * 100)
+            # Use all products when run with command line arguments. A regular file gets
+            # a cheap counting pass up front and is then streamed one line at a time.
+            # Pipes and devices (e.g. /dev/stdin) can only be read once, so their
+            # products are read into a list instead.
+            if os.path.isfile(args.products_file):
+                total_products = sum(1 for _ in iter_products(args.products_file))
+                selected_products = iter_products(args.products_file)
+            else:
+                selected_products = list(iter_products(args.products_file))
+                total_products = len(selected_products)
             
-            # Classify the product
-            final_leaf = classify_product_with_stage_display(navigator, product_line, show_paths)
+            if total_products == 0:
+                print("❌ No products found in the file.")
+                sys.exit(1)
+        
+        # Keep-alive connection pool sized for the concurrent requests we expect to make,
+        # so bursts of API calls reuse sockets instead of paying a new TLS handshake each time
+        import httpx
+        pool_size = max(1, args.concurrency) * 2
+        with httpx.Client(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size, keepalive_expiry=60),
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        ) as http_client:
+            # Initialize the taxonomy navigator (from the parsed-taxonomy cache when it is current)
+            try:
+                navigator = load_navigator(args.taxonomy_file, api_key, args.model, http_client)
+            except FileNotFoundError:
+                print(f"❌ Error: Taxonomy file '{args.taxonomy_file}' not found.")
+                sys.exit(1)
             
-            # Display in the exact format requested: [Input] then Leaf Category
-            print(f"\n[PRODUCT INPUT]")
-            print(f"{product_line}")
-            print(f"\n[FINAL CATEGORY]") 
-            print(final_leaf)
+            if pretty:
+                sys.stdout.write(
+                    f"\n🚀 Starting Classification Process...\n"
+                    f"   Total Products: {total_products}\n"
+                    f"   Taxonomy Categories: ~5,000+ options to choose from\n"
+                    f"{_SEP80}\n"
+                )
             
-            # More prominent separation between products
-            if i < len(selected_products) - 1:  # Don't add separator after the last product
-                print("\n" + "="*100 + "\n")
+            # Process each selected product and display in the requested format.
+            # Products are classified in batches that share one Stage 1 API call, with
+            # the products of each batch classified concurrently.
+            classified = classify_in_batches(navigator, selected_products, args.batch_size, args.show_stage_paths, args.concurrency)
+            for i, (product_line, result) in enumerate(classified):
+                # Show Stage paths for every product if requested (not just the first one)
+                show_paths = args.show_stage_paths
+                
+                # Collect this product's output and write it in one go, rather than one
+                # print (and stdout flush) per line
+                buf = []
+                
+                if show_paths:
+                    buf.append(f"\n{_SEP20} PRODUCT {i+1} of {total_products} {_SEP20}")
+                    buf.append(f"\n📦 PRODUCT DESCRIPTION:")
+                    buf.append(f"   Full: {product_line[:100]}..." if len(product_line) > 100 else f"   Full: {product_line}")
+                    buf.append(f"   AI will generate a 40-60 word summary for all categorization stages")
+                    buf.append(_SEP100)
+                
+                # Classify the product
+                final_leaf = classify_product_with_stage_display(navigator, product_line, show_paths, result, buf)
+                
+                if not pretty:
+                    sys.stdout.write(f"{product_line}\t{final_leaf}\n")
+                    continue
+                
+                # Display in the exact format requested: [Input] then Leaf Category
+                buf.append(f"\n[PRODUCT INPUT]")
+                buf.append(f"{product_line}")
+                buf.append(f"\n[FINAL CATEGORY]")
+                buf.append(final_leaf)
+                
+                # More prominent separation between products
+                if i < total_products - 1:  # Don't add separator after the last product
+                    buf.append(_PRODUCT_SEP)
+                
+                sys.stdout.write("\n".join(buf) + "\n")
+                sys.stdout.flush()
         
     except KeyboardInterrupt:
         print("\n❌ Testing interrupted by user")
@@ -3,296 +3,416 @@
 Test script for the Taxonomy Navigator.
 
 This script performs basic tests on the TaxonomyNavigator class to ensure
-the 5-stage classification process works as expected.
+the 5-stage classification process works as expected, along with the batch
+helpers in simple_batch_tester.py.
 """
 
 import os
+import re
 import sys
-import unittest
-import tempfile
+import copy
+import json
+import time
+import pickle
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 
+import pytest
+
 # Add the src directory to the Python path for module imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
-from taxonomy_navigator_engine import TaxonomyNavigator
-
-class TestTaxonomyNavigator(unittest.TestCase):
-    """Test cases for the TaxonomyNavigator class with 5-stage classification."""
-
-    def setUp(self):
-        """Set up test fixtures."""
-        # Create a temporary taxonomy file
-        self.temp_taxonomy = tempfile.NamedTemporaryFile(delete=False, mode='w+')
-        self.temp_taxonomy.write("# Test Taxonomy\n")
-        self.temp_taxonomy.write("Electronics\n")
-        self.temp_taxonomy.write("Electronics > Cell Phones\n")
-        self.temp_taxonomy.write("Electronics > Cell Phones > Smartphones\n")
-        self.temp_taxonomy.write("Electronics > Computers\n")
-        self.temp_taxonomy.write("Electronics > Computers > Laptops\n")
-        self.temp_taxonomy.write("Apparel\n")
-        self.temp_taxonomy.write("Apparel > Shoes\n")
-        self.temp_taxonomy.write("Apparel > Shoes > Athletic Shoes\n")
-        self.temp_taxonomy.close()
-        
-        # Mock OpenAI client
-        self.mock_openai_client = MagicMock()
-
-    def tearDown(self):
-        """Tear down test fixtures."""
-        os.unlink(self.temp_taxonomy.name)
-
-    @patch('openai.OpenAI')
-    def test_build_taxonomy_tree(self, mock_openai):
-        """Test that the taxonomy tree is built correctly."""
-        mock_openai.return_value = self.mock_openai_client
-        
-        navigator = TaxonomyNavigator(self.temp_taxonomy.name, "dummy_api_key")
-        tree = navigator.taxonomy_tree
-        
-        # Check tree structure
-        self.assertIn("Electronics", tree["children"])
-        self.assertIn("Apparel", tree["children"])
-        self.assertIn("Cell Phones", tree["children"]["Electronics"]["children"])
-        self.assertIn("Computers", tree["children"]["Electronics"]["children"])
-        self.assertIn("Smartphones", tree["children"]["Electronics"]["children"]["Cell Phones"]["children"])
-
-    @patch('openai.OpenAI')
-    def test_stage1_leaf_matching(self, mock_openai):
-        """Test Stage 1: Initial leaf node matching."""
-        # Mock response for Stage 1 (top 20 leaf nodes)
-        mock_response = MagicMock()
-        mock_response.choices = [MagicMock()]
-        mock_response.choices[0].message.content = "Smartphones\nLaptops\nAthletic Shoes"
-        
-        mock_client = MagicMock()
-        mock_client.chat.completions.create.return_value = mock_response
-        mock_openai.return_value = mock_client
-        
-        navigator = TaxonomyNavigator(self.temp_taxonomy.name, "dummy_api_key")
-        result = navigator.stage1_leaf_matching("iPhone 14: Smartphone")
-        
-        # Check that OpenAI was called
-        mock_client.chat.completions.create.assert_called_once()
-        
-        # Check the result contains expected categories
-        self.assertIn("Smartphones", result)
-        self.assertIn("Laptops", result)
-        self.assertIn("Athletic Shoes", result)
-
-    @patch('openai.OpenAI')
-    def test_stage2_layer_filtering(self, mock_openai):
-        """Test Stage 2: Layer filtering."""
-        mock_openai.return_value = self.mock_openai_client
-        
-        navigator = TaxonomyNavigator(self.temp_taxonomy.name, "dummy_api_key")
-        
-        # Test with mixed categories from different layers
-        selected_leaves = ["Smartphones", "Laptops", "Athletic Shoes"]
-        filtered = navigator.stage2_layer_filtering(selected_leaves)
-        
-        # Should filter to most popular layer (Electronics has 2, Apparel has 1)
-        self.assertIn("Smartphones", filtered)
-        self.assertIn("Laptops", filtered)
-        self.assertNotIn("Athletic Shoes", filtered)
-
-    @patch('openai.OpenAI')
-    def test_stage3_refined_selection(self, mock_openai):
-        """Test Stage 3: Refined selection."""
-        # Mock response for Stage 3 (top 10 from filtered)
-        mock_response = MagicMock()
-        mock_response.choices = [MagicMock()]
-        mock_response.choices[0].message.content = "Smartphones\nLaptops"
-        
-        mock_client = MagicMock()
-        mock_client.chat.completions.create.return_value = mock_response
-        mock_openai.return_value = mock_client
-        
-        navigator = TaxonomyNavigator(self.temp_taxonomy.name, "dummy_api_key")
-        filtered_leaves = ["Smartphones", "Laptops"]
-        result = navigator.stage3_refined_selection("iPhone 14: Smartphone", filtered_leaves)
-        
-        # Check that OpenAI was called
-        mock_client.chat.completions.create.assert_called_once()
-        
-        # Check the result
-        self.assertIn("Smartphones", result)
-        self.assertIn("Laptops", result)
-
-    @patch('openai.OpenAI')
-    def test_stage4_validation(self, mock_openai):
-        """Test Stage 4: Validation."""
-        mock_openai.return_value = self.mock_openai_client
-        
-        navigator = TaxonomyNavigator(self.temp_taxonomy.name, "dummy_api_key")
-        
-        # Test with mix of valid and invalid categories
-        refined_leaves = ["Smartphones", "Laptops", "InvalidCategory"]
-        validated = navigator.stage4_validation(refined_leaves)
-        
-        # Should only return valid categories
-        self.assertIn("Smartphones", validated)
-        self.assertIn("Laptops", validated)
-        self.assertNotIn("InvalidCategory", validated)
-        self.assertEqual(len(validated), 2)
-
-    def test_stage5_final_selection(self):
-        """Test Stage 5: Final selection with anti-hallucination measures and failure handling."""
-        navigator = TaxonomyNavigator(self.temp_taxonomy.name, "dummy_api_key")
-        
-        # Test with valid candidates
-        validated_leaves = ["Smartphones", "Cell Phones"]
-        result = navigator.stage5_final_selection("iPhone 14: Smartphone", validated_leaves)
-        
-        # Should return a valid index (0 or 1) or -1 for failure
-        self.assertTrue(result in [0, 1] or result == -1)
-        self.assertIsInstance(result, int)
-        
-        # Test with single candidate
-        single_candidate = ["Smartphones"]
-        result = navigator.stage5_final_selection("iPhone 14: Smartphone", single_candidate)
-        self.assertEqual(result, 0)  # Should return 0 for single candidate
-        
-        # Test with empty list (edge case) - should return -1 for failure
-        result = navigator.stage5_final_selection("iPhone 14: Smartphone", [])
-        self.assertEqual(result, -1)  # Should return -1 for failure
-        
-        # Test anti-hallucination: result should always be valid or -1 for failure
-        test_candidates = ["Smartphones", "Cell Phones", "Mobile Devices"]
-        result = navigator.stage5_final_selection("iPhone 14: Smartphone", test_candidates)
-        self.assertTrue((0 <= result < len(test_candidates)) or result == -1)
-        
-        print("✅ Stage 5 final selection with anti-hallucination measures and failure handling working correctly")
-
-    @patch('openai.OpenAI')
-    def test_navigate_taxonomy_full_process(self, mock_openai):
-        """Test the complete 5-stage taxonomy navigation process."""
-        # Set up OpenAI responses for each stage
-        responses = [
-            # Stage 1: Leaf matching
-            MagicMock(choices=[MagicMock(message=MagicMock(content="Smartphones\nLaptops\nAthletic Shoes"))]),
-            # Stage 3: Refined selection
-            MagicMock(choices=[MagicMock(message=MagicMock(content="Smartphones\nLaptops"))]),
-            # Stage 5: Final selection
-            MagicMock(choices=[MagicMock(message=MagicMock(content="1"))])
-        ]
-        
-        mock_client = MagicMock()
-        mock_client.chat.completions.create.side_effect = responses
-        mock_openai.return_value = mock_client
-        
-        navigator = TaxonomyNavigator(self.temp_taxonomy.name, "dummy_api_key")
-        paths, best_idx = navigator.navigate_taxonomy("iPhone 14: Smartphone")
-        
-        # Check that we got valid results
-        self.assertIsInstance(paths, list)
-        self.assertIsInstance(best_idx, int)
-        self.assertGreaterEqual(best_idx, 0)
-        
-        # Check that the best path is valid
-        if paths != [["False"]]:
-            self.assertLess(best_idx, len(paths))
-            best_path = paths[best_idx]
-            self.assertIsInstance(best_path, list)
-            self.assertGreater(len(best_path), 0)
-
-    @patch('openai.OpenAI')
-    def test_save_results(self, mock_openai):
-        """Test saving results to a file."""
-        mock_openai.return_value = self.mock_openai_client
-        
-        with tempfile.NamedTemporaryFile(delete=False) as temp_output:
-            temp_output_path = temp_output.name
-        
-        navigator = TaxonomyNavigator(self.temp_taxonomy.name, "dummy_api_key")
-        paths = [["Electronics", "Cell Phones", "Smartphones"]]
-        best_idx = 0
-        navigator.save_results("iPhone 14: Smartphone", paths, best_idx, temp_output_path)
-        
-        # Check that the file was created and contains valid JSON
-        import json
-        with open(temp_output_path, 'r') as f:
-            data = json.load(f)
-        
-        self.assertEqual(len(data), 1)
-        self.assertEqual(data[0]["product_info"], "iPhone 14: Smartphone")
-        self.assertEqual(data[0]["best_match_index"], 0)
-        self.assertEqual(len(data[0]["matches"]), 1)
-        self.assertEqual(data[0]["matches"][0]["category_path"], ["Electronics", "Cell Phones", "Smartphones"])
-        
-        os.unlink(temp_output_path)
-
-    def test_parse_selection_number_robust(self):
-        """Test robust parsing of AI selection numbers with anti-hallucination measures and failure handling."""
-        navigator = TaxonomyNavigator(self.temp_taxonomy.name, "dummy_api_key")
-        
-        # Test valid numbers
-        self.assertEqual(navigator._parse_selection_number("1", 3), 0)
-        self.assertEqual(navigator._parse_selection_number("2", 3), 1)
-        self.assertEqual(navigator._parse_selection_number("3", 3), 2)
-        
-        # Test with extra text
-        self.assertEqual(navigator._parse_selection_number("Option 1", 3), 0)
-        self.assertEqual(navigator._parse_selection_number("The answer is 2", 3), 1)
-        
-        # Test out-of-range numbers (should default to 0)
-        self.assertEqual(navigator._parse_selection_number("0", 3), 0)  # Too low
-        self.assertEqual(navigator._parse_selection_number("4", 3), 0)  # Too high
-        self.assertEqual(navigator._parse_selection_number("999", 3), 0)  # Way too high
-        
-        # Test invalid input (should default to 0)
-        self.assertEqual(navigator._parse_selection_number("invalid", 3), 0)
-        self.assertEqual(navigator._parse_selection_number("abc", 3), 0)
-        
-        # Test edge cases
-        self.assertEqual(navigator._parse_selection_number("1.5", 3), 0)  # Decimal
-        self.assertEqual(navigator._parse_selection_number("-1", 3), 0)  # Negative
-        
-        # Test complete failure cases (should return -1)
-        self.assertEqual(navigator._parse_selection_number("", 3), -1)  # Empty string
-        self.assertEqual(navigator._parse_selection_number("error", 3), -1)  # Error response
-        self.assertEqual(navigator._parse_selection_number("false", 3), -1)  # False response
-        self.assertEqual(navigator._parse_selection_number("none", 3), -1)  # None response
-        
-        print("✅ Robust selection number parsing with anti-hallucination measures and failure handling working correctly")
-
-    def test_anti_hallucination_comprehensive(self):
-        """Comprehensive test of all anti-hallucination measures in the system including failure handling."""
-        navigator = TaxonomyNavigator(self.temp_taxonomy.name, "dummy_api_key")
-        
-        print("🔒 Testing comprehensive anti-hallucination measures with failure handling...")
-        
-        # Test Stage 4 validation with mix of valid and invalid categories
-        test_categories = ["Smartphones", "Laptops", "InvalidCategory", "Athletic Shoes", "AnotherInvalid"]
-        validated = navigator.stage4_validation(test_categories)
-        
-        # Should only return valid categories
-        expected_valid = ["Smartphones", "Laptops", "Athletic Shoes"]
-        self.assertEqual(len(validated), 3)
-        for cat in validated:
-            self.assertIn(cat, expected_valid)
-        
-        # Test bounds checking with various list sizes
-        for list_size in [1, 2, 3, 5, 10]:
-            for test_input in ["1", "999", "invalid", "", "-1"]:
-                result = navigator._parse_selection_number(test_input, list_size)
-                # Should be valid index OR -1 for complete failure
-                self.assertTrue((0 <= result < list_size) or result == -1)
-        
-        # Test Stage 5 always returns valid indices or -1 for failure
-        test_candidates = ["Smartphones", "Cell Phones", "Mobile Devices"]
-        result = navigator.stage5_final_selection("iPhone 14: Smartphone", test_candidates)
-        self.assertTrue((0 <= result < len(test_candidates)) or result == -1)
-        
-        # Test Stage 5 failure case
-        result_failure = navigator.stage5_final_selection("iPhone 14: Smartphone", [])
-        self.assertEqual(result_failure, -1)
-        
-        print("✅ All anti-hallucination measures working correctly")
-        print("  ✅ Stage 4 validation removes invalid categories")
-        print("  ✅ Robust index validation prevents out-of-bounds access")
-        print("  ✅ Stage 5 guarantees valid category selection or returns -1 for failure")
-        print("  ✅ Multiple fallback mechanisms handle edge cases")
-        print("  ✅ Complete failures return -1 instead of incorrect defaults")
+from taxonomy_navigator_engine import TaxonomyNavigator, STAGE1_BATCH_RESPONSE_FORMAT, LEAF_SELECTION_RESPONSE_FORMAT
+import simple_batch_tester
+
+# Small taxonomy used by every test, one taxonomy file line per entry (header line first)
+TAXONOMY_LINES = (
+    "# Test Taxonomy",
+    "Electronics",
+    "Electronics > Cell Phones",
+    "Electronics > Cell Phones > Smartphones",
+    "Electronics > Computers",
+    "Electronics > Computers > Laptops",
+    "Apparel",
+    "Apparel > Shoes",
+    "Apparel > Shoes > Athletic Shoes",
+)
+
+# Root-to-leaf paths that TAXONOMY_LINES should produce
+EXPECTED_LEAF_PATHS = {
+    ("Electronics", "Cell Phones", "Smartphones"),
+    ("Electronics", "Computers", "Laptops"),
+    ("Apparel", "Shoes", "Athletic Shoes"),
+}
+
+def _flatten_leaf_paths(node, prefix=()):
+    """Collect every root-to-leaf path in a taxonomy tree as a set of name tuples."""
+    paths = set()
+    for name, child in node["children"].items():
+        path = prefix + (name,)
+        if child["children"]:
+            paths |= _flatten_leaf_paths(child, path)
+        else:
+            paths.add(path)
+    return paths
+
+def _resp(content):
+    """Build a chat completion response with the given message content.
+    
+    Plain namespaces have the same shape the engine reads (choices[0].message.content)
+    without MagicMock's per-attribute overhead.
+    """
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+# Product used by the stage tests, standing in for its AI-generated summary
+PRODUCT = "iPhone 14: Smartphone"
+
+# Mocked AI responses, built once and reused wherever a test needs them
+SUMMARY_RESP = _resp("Smartphone (mobile phone, cell phone). Apple iPhone 14 handset.")  # Product summary
+L1_RESP = _resp("Electronics\nApparel")            # Stage 1: two L1 categories
+LEAVES_2A_RESP = _resp('{"selected": [1, 2]}')      # Stage 2A: Smartphones, Laptops
+LEAVES_2B_RESP = _resp('{"selected": [1]}')         # Stage 2B: Athletic Shoes
+FINAL_RESP = _resp("1")                             # Stage 3: first candidate
+
+# Stage methods that return a list of categories share one test shape. Each case is
+# (method, mocked AI response or None if the method makes no API call, arguments,
+# exact set of categories expected in the result).
+STAGE_CASES = (
+    # Stage 1: the two L1 categories named by the AI
+    pytest.param("stage1_l1_selection", L1_RESP, (PRODUCT,),
+                 {"Electronics", "Apparel"}, id="stage1"),
+    # Stage 1: names that are not L1 categories are dropped (anti-hallucination)
+    pytest.param("stage1_l1_selection", _resp("Electronics\nSmartphones\nApparel"), (PRODUCT,),
+                 {"Electronics", "Apparel"}, id="stage1-hallucination"),
+    # Stage 2A: option numbers map to the first L1's leaves, in taxonomy order
+    pytest.param("stage2a_first_leaf_selection", LEAVES_2A_RESP, (PRODUCT, ["Electronics", "Apparel"]),
+                 {"Smartphones", "Laptops"}, id="stage2a"),
+    # Stage 2: excluded leaves are not offered, so option 2 is out of range and ignored
+    pytest.param("_leaf_selection_helper", LEAVES_2A_RESP,
+                 (PRODUCT, ["Electronics"], ["Smartphones"], "2B", "second 15"),
+                 {"Laptops"}, id="stage2-excluded"),
+    # Validation: case-insensitive matches resolve to the taxonomy spelling, without duplicates
+    pytest.param("_validate_categories", None,
+                 (["smartphones", "LAPTOPS", "Smartphones"], ["Smartphones", "Laptops", "Athletic Shoes"]),
+                 {"Smartphones", "Laptops"}, id="validate"),
+)
+
+# Products for the batch tests, by keyword: (expected leaf path, fake API latency in seconds).
+# Earlier products answer more slowly, so concurrent classification finishes them out of order.
+KEYWORD_CASES = {
+    "phone": (["Electronics", "Cell Phones", "Smartphones"], 0.03),
+    "laptop": (["Electronics", "Computers", "Laptops"], 0.02),
+    "shoe": (["Apparel", "Shoes", "Athletic Shoes"], 0.01),
+}
+BATCH_PRODUCTS = ("iPhone 14: Smartphone", "MacBook Air: Laptop", "Nike Pegasus: Running shoe")
+
+def _keyword_case(product):
+    """Return the KEYWORD_CASES entry for a product."""
+    return next(case for keyword, case in KEYWORD_CASES.items() if keyword in product.lower())
+
+def _fake_create(**kwargs):
+    """Answer every pipeline call from its prompt, so replies do not depend on call order.
+    
+    The summary of a product is the product itself, Stage 1 picks the L1 of the product's
+    keyword path and Stage 2 picks the option numbered for its leaf.
+    """
+    prompt = kwargs["messages"][-1]["content"]
+    response_format = kwargs.get("response_format")
+    
+    if response_format is STAGE1_BATCH_RESPONSE_FORMAT:
+        products = re.findall(r"^Product \d+: (.*)$", prompt, re.M)
+        return _resp(json.dumps({"selections": [[_keyword_case(product)[0][0]] for product in products]}))
+    
+    product = re.search(r"^Product: (.*)$", prompt, re.M).group(1)
+    path, latency = _keyword_case(product)
+    time.sleep(latency)
+    if prompt.endswith("Summary:"):
+        return _resp(product)
+    if response_format is LEAF_SELECTION_RESPONSE_FORMAT:
+        number = re.search(rf"^(\d+)\. {re.escape(path[-1])} \(L1:", prompt, re.M).group(1)
+        return _resp(json.dumps({"selected": [int(number)]}))
+    return _resp(path[0]) if "Select exactly 2" in prompt else _resp("1")
+
+@pytest.fixture(scope="module")
+def mock_openai_client():
+    """One mocked OpenAI client shared by every test in the module.
+    
+    The spec limits it to the attributes the engine uses (client.chat.completions.create),
+    so no other child mocks are synthesized.
+    """
+    client = MagicMock(spec=["chat"])
+    client.chat = MagicMock(spec=["completions"])
+    client.chat.completions = MagicMock(spec=["create"])
+    client.chat.completions.create = MagicMock()
+    return client
+
+@pytest.fixture(scope="module")
+def navigator(mock_openai_client):
+    """Navigator over TAXONOMY_LINES, parsed once in memory and shared by read-only tests.
+    
+    The navigator keeps the client it was built with, so the patch only needs to be
+    active while the navigator is constructed.
+    """
+    with patch('openai.OpenAI', return_value=mock_openai_client):
+        return TaxonomyNavigator.from_lines(TAXONOMY_LINES, "dummy_api_key")
+
+@pytest.fixture
+def fresh_navigator(navigator, mock_openai_client):
+    """Private deep copy of the shared navigator for tests that mutate it.
+    
+    The memo keeps the copy wired to the shared mock client instead of cloning it.
+    """
+    return copy.deepcopy(navigator, {id(mock_openai_client): mock_openai_client})
+
+@pytest.fixture(autouse=True)
+def _reset_mock_client(mock_openai_client):
+    """Forget responses and calls configured by earlier tests."""
+    mock_openai_client.reset_mock(return_value=True, side_effect=True)
+
+def test_build_taxonomy_tree(navigator):
+    """Test that the taxonomy tree is built correctly."""
+    tree = navigator.taxonomy_tree
+    
+    # Check tree structure: exactly the expected leaves, each under its full path
+    assert _flatten_leaf_paths(tree) == EXPECTED_LEAF_PATHS
+
+@pytest.mark.parametrize("stage_method, response, args, expected", STAGE_CASES)
+def test_stage_selections(navigator, mock_openai_client, stage_method, response, args, expected):
+    """Test the stage methods that return a list of categories, from one table of cases."""
+    mock_create = mock_openai_client.chat.completions.create
+    if response is not None:
+        mock_create.return_value = response
+    
+    result = getattr(navigator, stage_method)(*args)
+    
+    # Stages that query the AI make exactly one call (every case fits in one batch)
+    if response is not None:
+        mock_create.assert_called_once()
+    else:
+        mock_create.assert_not_called()
+    
+    # Set equality also catches unexpected extra categories; the length check catches duplicates
+    assert set(result) == expected
+    assert len(result) == len(expected)
+
+def test_stage3_final_selection(navigator, mock_openai_client):
+    """Test Stage 3: final selection by number, with bounds checking and failure handling."""
+    mock_create = mock_openai_client.chat.completions.create
+    candidates = ["Smartphones", "Laptops", "Athletic Shoes"]
+    
+    # The AI's 1-based choice becomes a 0-based index
+    mock_create.return_value = _resp("2")
+    assert navigator.stage3_final_selection(PRODUCT, candidates) == 1
+    mock_create.assert_called_once()
+    
+    # A meaningless reply is a complete failure (-1)
+    mock_create.return_value = _resp("none")
+    assert navigator.stage3_final_selection(PRODUCT, candidates) == -1
+    
+    # A single candidate is used without an API call, and no candidates is a failure
+    mock_create.reset_mock()
+    assert navigator.stage3_final_selection(PRODUCT, ["Smartphones"]) == 0
+    assert navigator.stage3_final_selection(PRODUCT, []) == -1
+    mock_create.assert_not_called()
+    
+    print("✅ Stage 3 final selection with anti-hallucination measures and failure handling working correctly")
+
+def test_navigate_taxonomy_full_process(fresh_navigator, mock_openai_client):
+    """Test the complete classification pipeline: summary, Stage 1, Stages 2A/2B and Stage 3."""
+    # One mocked reply per API call, in pipeline order
+    mock_create = mock_openai_client.chat.completions.create
+    mock_create.side_effect = [SUMMARY_RESP, L1_RESP, LEAVES_2A_RESP, LEAVES_2B_RESP, FINAL_RESP]
+    
+    # Navigation fills the navigator's lookup caches, so work on a private copy
+    paths, best_idx, stages = fresh_navigator.navigate_taxonomy(PRODUCT, return_intermediates=True)
+    
+    # Every stage ran, and Stage 3 picked the first of the combined candidates
+    assert mock_create.call_count == 5
+    assert stages["selected_l1s"] == ["Electronics", "Apparel"]
+    assert stages["leaves_2a"] == ["Smartphones", "Laptops"]
+    assert stages["leaves_2b"] == ["Athletic Shoes"]
+    assert (paths, best_idx) == ([["Electronics", "Cell Phones", "Smartphones"]], 0)
+
+def test_parse_and_validate_number_robust(navigator):
+    """Test robust parsing of AI selection numbers with anti-hallucination measures and failure handling."""
+    def parse(content, max_options=3):
+        return navigator._parse_and_validate_number(_resp(content), max_options)
+    
+    # Test valid numbers
+    assert parse("1") == 0
+    assert parse("2") == 1
+    assert parse("3") == 2
+    
+    # Test with extra text
+    assert parse("Option 1") == 0
+    assert parse("The answer is 2") == 1
+    
+    # Test out-of-range numbers (should default to 0)
+    assert parse("0") == 0  # Too low
+    assert parse("4") == 0  # Too high
+    assert parse("999") == 0  # Way too high
+    
+    # Test invalid input (should default to 0)
+    assert parse("invalid") == 0
+    assert parse("abc") == 0
+    
+    # Test edge cases
+    assert parse("1.5") == 0  # Decimal
+    assert parse("-1") == 0  # Negative
+    
+    # Test complete failure cases (should return -1)
+    assert parse("") == -1  # Empty string
+    assert parse("error") == -1  # Error response
+    assert parse("false") == -1  # False response
+    assert parse("none") == -1  # None response
+    
+    print("✅ Robust selection number parsing with anti-hallucination measures and failure handling working correctly")
+
+def test_anti_hallucination_comprehensive(navigator, mock_openai_client):
+    """Comprehensive test of all anti-hallucination measures in the system including failure handling."""
+    mock_create = mock_openai_client.chat.completions.create
+    
+    print("🔒 Testing comprehensive anti-hallucination measures with failure handling...")
+    
+    # Test Stage 2 ignores option numbers outside the offered batch
+    mock_create.return_value = _resp('{"selected": [0, 2, 99]}')
+    assert navigator.stage2a_first_leaf_selection(PRODUCT, ["Electronics"]) == ["Laptops"]
+    
+    # Test bounds checking with various list sizes
+    for list_size in [1, 2, 3, 5, 10]:
+        for test_input in ["1", "999", "invalid", "", "-1"]:
+            result = navigator._parse_and_validate_number(_resp(test_input), list_size)
+            # Should be valid index OR -1 for complete failure
+            assert (0 <= result < list_size) or result == -1
+    
+    # Test Stage 3 always returns valid indices or -1 for failure
+    test_candidates = ["Smartphones", "Laptops", "Athletic Shoes"]
+    mock_create.return_value = _resp("999")
+    result = navigator.stage3_final_selection(PRODUCT, test_candidates)
+    assert (0 <= result < len(test_candidates)) or result == -1
+    
+    # Test Stage 3 failure case
+    result_failure = navigator.stage3_final_selection(PRODUCT, [])
+    assert result_failure == -1
+    
+    print("✅ All anti-hallucination measures working correctly")
+    print("  ✅ Stage 1 drops categories that are not in the taxonomy")
+    print("  ✅ Stage 2 ignores option numbers outside the offered batch")
+    print("  ✅ Robust index validation prevents out-of-bounds access")
+    print("  ✅ Stage 3 guarantees valid category selection or returns -1 for failure")
+    print("  ✅ Complete failures return -1 instead of incorrect defaults")
+
+def test_stage1_batch_selections(navigator, mock_openai_client):
+    """Test batched Stage 1: one structured-output call, validated per product."""
+    mock_create = mock_openai_client.chat.completions.create
+    mock_create.return_value = _resp('{"selections": [["Electronics", "Apparel"], ["Apparel", "Made Up"]]}')
+    
+    result = navigator.stage1_l1_selection_batch(["iPhone 14: Smartphone", "Nike Pegasus: Running shoe"])
+    
+    mock_create.assert_called_once()
+    assert mock_create.call_args.kwargs["response_format"] is STAGE1_BATCH_RESPONSE_FORMAT
+    assert result == [["Electronics", "Apparel"], ["Apparel"]]
+
+@pytest.mark.parametrize("batch_reply", [
+    pytest.param("Electronics, Apparel", id="malformed"),
+    pytest.param('{"selections": [["Electronics"]]}', id="wrong-length"),
+])
+def test_stage1_batch_falls_back_per_product(navigator, mock_openai_client, batch_reply):
+    """Test that an unusable batched Stage 1 reply falls back to one call per product."""
+    mock_create = mock_openai_client.chat.completions.create
+    mock_create.side_effect = [_resp(batch_reply), L1_RESP, _resp("Apparel")]
+    
+    result = navigator.stage1_l1_selection_batch(["iPhone 14: Smartphone", "Nike Pegasus: Running shoe"])
+    
+    assert mock_create.call_count == 3
+    assert result == [["Electronics", "Apparel"], ["Apparel"]]
+
+def test_parse_selected_numbers(navigator):
+    """Test Stage 2 reply parsing: structured JSON first, numbers in plain text as the fallback."""
+    assert navigator._parse_selected_numbers('{"selected": [3, 7]}') == [3, 7]
+    assert navigator._parse_selected_numbers('{"selected": []}') == []
+    assert navigator._parse_selected_numbers("3\n7") == [3, 7]
+    assert navigator._parse_selected_numbers("NONE") == []
+
+def test_navigate_taxonomy_batch_keeps_input_order(fresh_navigator, mock_openai_client):
+    """Test concurrent batch classification: results and intermediates come back in input order."""
+    mock_create = mock_openai_client.chat.completions.create
+    mock_create.side_effect = _fake_create
+    
+    results = fresh_navigator.navigate_taxonomy_batch(list(BATCH_PRODUCTS), return_intermediates=True, max_workers=3)
+    
+    # 3 summaries, 1 shared Stage 1 call and one Stage 2A call per product (2B and 3 are skipped)
+    assert mock_create.call_count == 7
+    assert len(results) == len(BATCH_PRODUCTS)
+    for product, (paths, best_idx, stages) in zip(BATCH_PRODUCTS, results):
+        path = _keyword_case(product)[0]
+        assert (paths, best_idx) == ([path], 0)
+        assert stages == {"summary": product, "selected_l1s": [path[0]], "leaves_2a": [path[-1]], "leaves_2b": []}
+
+def test_classify_in_batches_fans_out_duplicates():
+    """Test that repeated products are classified once and every occurrence gets the result."""
+    navigator = MagicMock(spec=["navigate_taxonomy_batch"])
+    navigator.navigate_taxonomy_batch.side_effect = lambda products, **kwargs: [(f"result {p}",) for p in products]
+    
+    products = ["Phone", "Laptop", "phone ", "LAPTOP", "Shoe"]
+    classified = list(simple_batch_tester.classify_in_batches(navigator, products, batch_size=2))
+    
+    # The second batch holds only repeats, so it makes no call at all
+    assert [call.args[0] for call in navigator.navigate_taxonomy_batch.call_args_list] == [["Phone", "Laptop"], ["Shoe"]]
+    assert classified == [
+        ("Phone", ("result Phone",)),
+        ("Laptop", ("result Laptop",)),
+        ("phone ", ("result Phone",)),
+        ("LAPTOP", ("result Laptop",)),
+        ("Shoe", ("result Shoe",)),
+    ]
+
+def test_classify_in_batches_evicts_least_recent(monkeypatch):
+    """Test that the duplicate cache is bounded and evicts the least recently seen product."""
+    monkeypatch.setattr(simple_batch_tester, "_RESULT_CACHE_SIZE", 2)
+    navigator = MagicMock(spec=["navigate_taxonomy_batch"])
+    navigator.navigate_taxonomy_batch.side_effect = lambda products, **kwargs: [(f"result {p}",) for p in products]
+    
+    # Reusing "A" makes "B" the least recent, so "C" evicts "B" and "B" is classified again
+    products = ["A", "B", "A", "C", "B", "A"]
+    classified = list(simple_batch_tester.classify_in_batches(navigator, products, batch_size=1))
+    
+    assert [call.args[0] for call in navigator.navigate_taxonomy_batch.call_args_list] == [["A"], ["B"], ["C"], ["B"], ["A"]]
+    assert classified == [(p, (f"result {p}",)) for p in products]
+
+def test_iter_products_chunk_boundaries(tmp_path, monkeypatch):
+    """Test that products split across read chunks, including multi-byte characters, are rejoined."""
+    products_file = tmp_path / "products.txt"
+    products_file.write_bytes("Café crème: Coffee\r\n\n  Über phone  \nLast line without newline".encode("utf-8"))
+    expected = ["Café crème: Coffee", "Über phone", "Last line without newline"]
+    
+    for chunk_size in (2, 3, 5, 64):
+        monkeypatch.setattr(simple_batch_tester, "_READ_CHUNK_SIZE", chunk_size)
+        assert list(simple_batch_tester.iter_products(str(products_file))) == expected
+
+def test_pickle_round_trip(navigator, mock_openai_client, tmp_path):
+    """Test that save_pickle() stores only parsed data and from_pickle() rebuilds the same navigator."""
+    pickle_file = str(tmp_path / "taxonomy.pkl")
+    navigator.save_pickle(pickle_file)
+    
+    with open(pickle_file, 'rb') as f:
+        assert set(pickle.load(f)) == {"version", "taxonomy_tree", "all_paths", "leaf_markers"}
+    
+    with patch('openai.OpenAI', return_value=mock_openai_client):
+        loaded = TaxonomyNavigator.from_pickle(pickle_file, "taxonomy.txt", "dummy_api_key")
+    
+    assert loaded.taxonomy_tree == navigator.taxonomy_tree
+    assert loaded.all_paths == navigator.all_paths
+    assert loaded.leaf_markers == navigator.leaf_markers
+    assert loaded._get_l1_categories() == ["Electronics", "Apparel"]
+    
+    # A pickle written by another navigator version is rejected
+    with open(pickle_file, 'wb') as f:
+        pickle.dump({"version": "0"}, f)
+    with pytest.raises(ValueError):
+        TaxonomyNavigator.from_pickle(pickle_file, "taxonomy.txt", "dummy_api_key")
 
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    # Run under pytest, spreading the tests over one worker per CPU when pytest-xdist is installed
+    from importlib.util import find_spec
+    args = [__file__] if find_spec("xdist") is None else ["-n", "auto", __file__]
+    sys.exit(pytest.main(args))